@@ -0,0 +1,40 @@
+# /app/benchmarks/exif_benchmark.py
+# Compares EXIF date extraction with PIL against the JPEG header reader, sequential and on the thread pool.
+# Usage (from /app/app): python -m benchmarks.exif_benchmark [directory] [--workers N]
+import os
+import sys
+import time
+import argparse
+from services.search.exif import read_dates
+from services.search.photos import photo_dir, PHOTO_EXTENSIONS, get_date_taken, pil_date_taken
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare EXIF date extraction with PIL and the header reader.")
+    parser.add_argument('directory', nargs='?', default=photo_dir)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    paths = [os.path.join(root, file) for root, _, files in os.walk(args.directory)
+             for file in files if file.lower().endswith(PHOTO_EXTENSIONS)]
+    print(f"{len(paths)} photos in {args.directory}")
+    if not paths:
+        return 1
+
+    runs = [
+        ("PIL, sequential", pil_date_taken, 1),
+        ("header, sequential", get_date_taken, 1),
+        ("header, thread pool", get_date_taken, args.workers),
+    ]
+    baseline = None
+    for name, read_date, workers in runs:
+        started = time.perf_counter()
+        dates = read_dates(paths, read_date, workers)
+        elapsed = time.perf_counter() - started
+        baseline = baseline or dates
+        mismatches = sum(1 for a, b in zip(dates, baseline) if a != b)
+        print(f"{name:<22} {elapsed:8.2f}s  {len(paths) / elapsed:9.0f} photos/s  "
+              f"{sum(1 for date in dates if date)} dated  {mismatches} differ from PIL")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# /app/benchmarks/extract_benchmark.py
+# Compares the page extraction engines against the original full BeautifulSoup scan.
+# Usage (from /app/app): python -m benchmarks.extract_benchmark "query words" [page.html ...]
+import sys
+import time
+import argparse
+from bs4 import BeautifulSoup
+from services.search.scoring import improved_string_matching
+from services.search.extract import EXTRACTORS, CHUNK_SIZE
+
+
+def original_inspect(html, user_input):
+    """The page scan inspect_page_source used before the extraction engines."""
+    soup = BeautifulSoup(html, 'html.parser')
+    json_ld = soup.find('script', type='application/ld+json')
+    if json_ld:
+        structured_data = json_ld.get_text()
+        if improved_string_matching(structured_data, user_input):
+            return structured_data[:500]
+    for tag in ['meta', 'div', 'span']:
+        for element in soup.find_all(tag):
+            if element.get('content'):
+                content = element.get('content').lower()
+                if improved_string_matching(content, user_input):
+                    return content[:500]
+    text = soup.get_text().lower()
+    if improved_string_matching(text, user_input):
+        return text[:500]
+    return None
+
+def engine_inspect(engine, html, user_input):
+    chunks = [html[i:i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE)]
+    extraction = engine.extract(chunks, lambda text: improved_string_matching(text, user_input))
+    for candidate in extraction.candidates:
+        if improved_string_matching(candidate, user_input):
+            return candidate[:500]
+    return None
+
+def synthetic_page(blocks=4000):
+    rows = "".join(
+        f'<div class="row"><span>Match {i}</span><div content="lag {i} spelar"><p>Text {i} om ingenting</p></div></div>'
+        for i in range(blocks)
+    )
+    return (
+        '<html><head><title>Schema</title><style>.row{}</style><script>var x = 1;</script></head>'
+        f'<body>{rows}<footer><meta content="björklöven spelar match idag klockan 19"></footer></body></html>'
+    ).encode()
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML extraction engines.")
+    parser.add_argument('query', nargs='?', default="när spelar björklöven match idag")
+    parser.add_argument('pages', nargs='*', help="HTML files to benchmark, defaults to a synthetic page")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [(path, open(path, 'rb').read()) for path in args.pages] or [("synthetic", synthetic_page())]
+    for name, html in pages:
+        print(f"{name}: {len(html) / 1024:.0f} KiB")
+        baseline, _ = timed(lambda: original_inspect(html, args.query), args.repeat)
+        print(f"  {'original':<12} {baseline * 1000:8.1f} ms")
+        for engine_name, engine_class in EXTRACTORS.items():
+            engine = engine_class()
+            elapsed, _ = timed(lambda: engine_inspect(engine, html, args.query), args.repeat)
+            print(f"  {engine_name:<12} {elapsed * 1000:8.1f} ms  ({baseline / elapsed:.1f}x)")
+
+if __name__ == "__main__":
+    sys.exit(main())
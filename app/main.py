@@ -1,17 +1,26 @@
 # /DuckDuckFind/app/main.py
-from flask import Flask, request, jsonify, render_template, send_from_directory, current_app, url_for, redirect, Response, flash, send_file
+from flask import Flask, request, jsonify, render_template, send_from_directory, current_app, url_for, redirect, Response, flash, send_file, g, make_response, copy_current_request_context
 import os
 import ast
 import pytz
 import requests
 import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from settings import *
 from services.search.search import *
 from services.search.documents import *
+from services.search.ingest import start_ingest, ingest_status
+from services.watcher import start_watchers
 from services.search.photos import *
 from services.stocks.price import *
 from services.connect.trafiklab import *
+from services.connect.http_client import get_pool_stats
+from services.cache import single_flight_stats
+from services.deadline import Deadline
+from services.progress import ProgressStream
 #°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
 app = Flask(__name__)
 app.config['SETTINGS'] = settings
@@ -29,6 +38,9 @@ ENABLE_DOCUMENT = get_setting("ENABLE_DOCUMENT")
 ENABLE_STOCK = get_setting("ENABLE_STOCK")
 ENABLE_PHOTO = get_setting("ENABLE_PHOTO")
 ENABLE_VIEWER = get_setting("ENABLE_VIEWER")
+ENABLE_WATCHER = get_setting("ENABLE_WATCHER")
+BATCH_CONCURRENCY = get_setting("BATCH_CONCURRENCY")
+BATCH_MAX_QUERIES = get_setting("BATCH_MAX_QUERIES")
 
 handlers = {
     'transport': lambda query: handle_transport(query) if ENABLE_TRANSPORT else web_search(query),
@@ -49,14 +61,50 @@ handlers = {
 def route_request(): 
     data = request.json
     query = data.get('query', '').lower()
+    g.deadline = Deadline.from_request(data)
 
+    if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+        return stream_request(query)
+
+    response = dispatch(query)
+    if g.deadline.exhausted_stage:
+        response = make_response(response)
+        response.headers['X-Deadline-Exhausted'] = g.deadline.exhausted_stage
+    return response 
+
+def dispatch(query):
     for trigger, handler in handlers.items():
         if any(word in query for word in globals().get(f"{trigger}_triggers", [])):
-            response = handler(query)
-            break
-    else:
-        response = handlers['default'](query)
-    return response 
+            return handler(query)
+    return handlers['default'](query)
+
+def stream_request(query):
+    """
+    Answer as Server-Sent Events: status events while the handlers work, a partial event with
+    scraped passages when there are any, then the answer event (or error) that ends the stream.
+    A spent deadline is reported as a deadline event, the headers are already sent by then.
+    """
+    progress = ProgressStream()
+    deadline = g.deadline
+    progress.emit("status", "Working on your question")
+
+    @copy_current_request_context
+    def run():
+        g.deadline = deadline
+        g.progress = progress
+        try:
+            answer = make_response(dispatch(query)).get_data(as_text=True)
+        except Exception as e:
+            logging.error(f"Streamed request failed: {e}")
+            progress.finish(f"An unexpected error occurred: {str(e)}", event="error")
+            return
+        if deadline.exhausted_stage:
+            progress.emit("deadline", deadline.exhausted_stage)
+        progress.finish(answer)
+
+    threading.Thread(target=run, daemon=True).start()
+    return Response(progress.events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 def handle_transport(query):
     try:
@@ -91,13 +139,19 @@ def handle_document(query):
     if not query:
         return "The query is empty after removing trigger words."
     
-    result_text = search_documents(query)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    try:
+        result_text = search_documents(query, limit=data.get('limit'), offset=data.get('offset'))
+    except ValueError as e:
+        return str(e)
     return result_text
 
 def web_search(query):
     if not query:
         return "No query provided"   
-    result = search_web_for_answer(query)
+    result = search_web_for_answer(query, g.get('deadline'), g.get('progress'))
     return result
 #°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
 #°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
@@ -113,6 +167,87 @@ def send_message():
     return route_request()
 #°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
 #°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
+#──→ BATCH ←──
+@app.route('/batch', methods=['POST'])
+def batch():
+    """
+    Answer several queries in one round trip.
+    Accepts {"queries": ["...", {"query": "...", "deadline": 5}, ...]} with an optional batch wide
+    "deadline", runs every query through the handlers BATCH_CONCURRENCY at a time and returns
+    the results in request order with status, elapsed_ms and error per query.
+    """
+    data = request.get_json(silent=True)
+    queries = data.get('queries') if isinstance(data, dict) else None
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "JSON payload with a non-empty 'queries' list is required"}), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({"error": f"At most {BATCH_MAX_QUERIES} queries per batch"}), 400
+
+    payloads = []
+    for item in queries:
+        payload = dict(item) if isinstance(item, dict) else {"query": item}
+        if 'deadline' in data:
+            payload.setdefault('deadline', data['deadline'])
+        payloads.append(payload)
+
+    with ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix="batch") as pool:
+        results = list(pool.map(run_batch_query, payloads))
+    return jsonify({"results": results})
+
+def run_batch_query(payload):
+    """Run one batch entry in its own request context, so handlers reading request.json see their own query."""
+    query = str(payload.get('query') or '')
+    started = time.monotonic()
+    entry = {"query": query, "result": None, "status": 200, "error": None}
+    if not query:
+        entry.update(status=400, error="No query provided", elapsed_ms=0.0)
+        return entry
+
+    with app.test_request_context('/', method='POST', json=payload):
+        g.deadline = Deadline.from_request(payload)
+        try:
+            response = make_response(dispatch(query.lower()))
+            entry["status"] = response.status_code
+            entry["result"] = response.get_data(as_text=True)
+            if response.status_code >= 400:
+                entry["error"] = entry["result"]
+        except Exception as e:
+            logging.error(f"Batch query {query!r} failed: {e}")
+            entry["status"] = 500
+            entry["error"] = str(e)
+        if g.deadline.exhausted_stage:
+            entry["deadline_exhausted"] = g.deadline.exhausted_stage
+    entry["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return entry
+#°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
+#°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
+#──→ DOCUMENT INGESTION ←──
+@app.route('/documents/ingest', methods=['GET', 'POST'])
+def documents_ingest():
+    """POST starts extracting and indexing new or changed documents in the background, GET reports progress."""
+    if request.method == 'GET':
+        return jsonify(ingest_status())
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    started = start_ingest(data.get('directory'), data.get('workers'), data.get('timeout'))
+    if not started:
+        return jsonify({**ingest_status(), "error": "Ingestion is already running"}), 409
+    return jsonify(ingest_status()), 202
+
+@app.route('/documents/search', methods=['GET', 'POST'])
+def documents_search():
+    """Ranked document matches with path, line and score, paged with limit and offset."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        data = request.args
+    try:
+        return jsonify(rank_documents(data.get('query', ''), limit=data.get('limit'), offset=data.get('offset'), fuzzy=data.get('fuzzy')))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+#°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
+#°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°°✶.•°•.•°•.•°•.✶°
 #──→ STOCK PRICE ←──
 @app.route('/stock_price', methods=['POST'])
 def handle_query():
@@ -374,6 +509,20 @@ def reset_settings():
 def health_check():
     return 'OK', 200
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        "http": get_pool_stats(),
+        "search_cache": search_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "ai_cache": ai_cache.stats(),
+        "domains": domain_stats.stats(),
+        "single_flight": single_flight_stats(),
+        "documents": document_index.stats(),
+        "document_texts": text_cache.stats(),
+        "photos": photo_index.stats(),
+    })
+
 @app.route('/favicon.ico')
 def favicon():
     return send_from_directory(os.path.join(app.root_path, 'static', 'img'), 'favicon.ico', mimetype='image/vnd.microsoft.icon')
@@ -394,6 +543,9 @@ if ENABLE_LOGGING:
     def log_response(response):
         if request.path.startswith('/static'):
             return response
+        if response.is_streamed:
+            logging.info(f"Response Status: {response.status} (streamed)")
+            return response
 
         logging.info(f"Response Status: {response.status}")
 
@@ -409,6 +561,25 @@ if ENABLE_LOGGING:
 else:
     print("Logging is disabled.")
 
+_watchers_started = False
+_watchers_lock = threading.Lock()
+
+@app.before_request
+def ensure_watchers():
+    """
+    Start the watchers with the first request, in a process that serves. The debug reloader's
+    monitor process and spawned ingest workers import this module too but never serve, so
+    they never watch. Several serving processes share one set through the lock in start_watchers.
+    """
+    global _watchers_started
+    if not ENABLE_WATCHER or _watchers_started:
+        return
+    with _watchers_lock:
+        if _watchers_started:
+            return
+        _watchers_started = True
+    start_watchers()
+
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0')
 
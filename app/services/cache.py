@@ -0,0 +1,228 @@
+# /app/services/cache.py
+
+print("/app/services/cache.py has been imported successfully!")
+
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import functools
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from collections import OrderedDict
+from settings import get_setting
+
+CACHE_DIR = get_setting("CACHE_DIR")
+flights = {}
+
+
+def normalize_query(query):
+    """Lowercase, trim punctuation and collapse whitespace so repeated questions share a cache key."""
+    query = re.sub(r'[?!.,]+', ' ', query.lower())
+    return " ".join(query.split())
+
+class TieredCache:
+    """
+    Two tier cache with per-entry TTLs.
+    An in-memory LRU tier holds the hottest max_entries values, a SQLite tier
+    survives restarts and is kept under max_db_bytes by evicting the least recently used rows.
+    Values must be JSON serializable.
+    """
+    def __init__(self, name, default_ttl, max_entries, max_db_bytes, db_path=None):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_db_bytes = max_db_bytes
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db = None
+        self._db_bytes = 0
+        self._open_db(db_path or os.path.join(CACHE_DIR, f"{name}.sqlite"))
+
+    def _open_db(self, db_path):
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+            self._db_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Cache '{self.name}' could not open {db_path}, using memory only: {e}")
+            self._db = None
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if row[1] > now:
+                        self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._delete_row(key)
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is None:
+                return
+            payload = json.dumps(value)
+            self._delete_row(key)
+            self._db.execute(
+                "INSERT INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), expires_at, now),
+            )
+            self._db_bytes += len(payload)
+            self._evict_db()
+            self._db.commit()
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _delete_row(self, key):
+        row = self._db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._db_bytes -= row[0]
+
+    def _evict_db(self):
+        if self._db_bytes <= self.max_db_bytes:
+            return
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        rows = self._db.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall()
+        self._db_bytes = sum(size for _, size in rows)
+        for key, size in rows:
+            if self._db_bytes <= self.max_db_bytes:
+                break
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._db_bytes -= size
+            self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+                self._db_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_entries"] = len(self._memory)
+            counters["disk_bytes"] = self._db_bytes
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        counters["hit_rate"] = round((lookups - counters["misses"]) / lookups, 3) if lookups else 0.0
+        return counters
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key. The first caller runs the function, callers
+    arriving while it runs wait and receive the same result or exception.
+    Nothing is kept after the call returns, caching results is left to the caller.
+    """
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "shared": 0, "timed_out": 0}
+
+    def do(self, key, func, *args, **kwargs):
+        return self.call(key, func, args, kwargs)
+
+    def call(self, key, func, args=(), kwargs=None, deadline=None, on_timeout=None):
+        """
+        func(*args, **kwargs), shared with a call already running for key. A waiting caller
+        gives up when its own deadline runs out, marks the deadline exhausted at the
+        "single_flight" stage and returns on_timeout(), None without one.
+        """
+        kwargs = kwargs or {}
+        with self._lock:
+            self._counters["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self._counters["shared"] += 1
+        if not leader:
+            try:
+                return call.result(timeout=deadline.remaining() if deadline is not None else None)
+            except FutureTimeoutError:
+                deadline.exhaust("single_flight")
+                with self._lock:
+                    self._counters["timed_out"] += 1
+                return on_timeout() if on_timeout else None
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["in_flight"] = len(self._calls)
+        return counters
+
+def single_flight(key=None, deadline=None, on_timeout=None):
+    """
+    Decorator running concurrent identical calls once through a SingleFlight named after the function.
+    key(*args, **kwargs) builds the key, by default the arguments themselves. deadline(*args, **kwargs)
+    picks the caller's Deadline out of the arguments, a waiting caller then returns
+    on_timeout(*args, **kwargs) once its deadline runs out.
+    """
+    def decorator(func):
+        flight = flights.setdefault(func.__name__, SingleFlight(func.__name__))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return flight.call(
+                call_key, func, args, kwargs,
+                deadline=deadline(*args, **kwargs) if deadline else None,
+                on_timeout=(lambda: on_timeout(*args, **kwargs)) if on_timeout else None,
+            )
+        wrapper.flight = flight
+        return wrapper
+    return decorator
+
+def single_flight_stats():
+    return {name: flight.stats() for name, flight in flights.items()}
@@ -0,0 +1,123 @@
+# /app/services/connect/http_client.py
+
+print("/app/services/connect/http_client.py has been imported successfully!")
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+from settings import get_setting, get_dict_setting
+
+HTTP_POOL_CONNECTIONS = get_setting("HTTP_POOL_CONNECTIONS")
+HTTP_POOL_MAXSIZE = get_setting("HTTP_POOL_MAXSIZE")
+HTTP_HOST_POOL_SIZES = get_dict_setting("HTTP_HOST_POOL_SIZES")
+HTTP_CONNECT_TIMEOUT = get_setting("HTTP_CONNECT_TIMEOUT")
+HTTP_READ_TIMEOUT = get_setting("HTTP_READ_TIMEOUT")
+
+_stats_lock = threading.Lock()
+_host_stats = {}
+_pool_wait = threading.local()  # seconds the current request may wait for a free connection
+
+
+def _record(host, wait=None, new_connection=False):
+    with _stats_lock:
+        stats = _host_stats.setdefault(host, {"requests": 0, "new_connections": 0, "wait_time": 0.0, "max_wait": 0.0})
+        if wait is not None:
+            stats["requests"] += 1
+            stats["wait_time"] += wait
+            stats["max_wait"] = max(stats["max_wait"], wait)
+        if new_connection:
+            stats["new_connections"] += 1
+
+class _StatsPoolMixin:
+    """
+    Counts checkouts, new connections and time spent waiting for a free connection.
+    The wait for a connection from an exhausted pool is bounded by the request's connect
+    timeout, so a full pool can't hold a request past its deadline.
+    """
+    def _get_conn(self, timeout=None):
+        if timeout is None:
+            timeout = getattr(_pool_wait, "seconds", HTTP_CONNECT_TIMEOUT)
+        started = time.monotonic()
+        try:
+            return super()._get_conn(timeout=timeout)
+        finally:
+            _record(self.host, wait=time.monotonic() - started)
+
+    def _new_conn(self):
+        _record(self.host, new_connection=True)
+        return super()._new_conn()
+
+class StatsHTTPConnectionPool(_StatsPoolMixin, HTTPConnectionPool):
+    pass
+
+class StatsHTTPSConnectionPool(_StatsPoolMixin, HTTPSConnectionPool):
+    pass
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools report statistics and wait, up to the connect timeout, when a host's pool is exhausted."""
+    def __init__(self, pool_connections, pool_maxsize):
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": StatsHTTPConnectionPool, "https": StatsHTTPSConnectionPool}
+
+def build_session():
+    """
+    Create a keep-alive session with pooled connections.
+    gzip/deflate are always accepted and decoded transparently, br as well when brotli is installed.
+    """
+    session = requests.Session()
+    default_adapter = PooledAdapter(HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE)
+    session.mount("http://", default_adapter)
+    session.mount("https://", default_adapter)
+
+    for host, pool_size in HTTP_HOST_POOL_SIZES.items():
+        host_adapter = PooledAdapter(1, int(pool_size))
+        session.mount(f"http://{host}", host_adapter)
+        session.mount(f"https://{host}", host_adapter)
+    return session
+
+session = build_session()
+
+def http_get(url, timeout=None, deadline=None, **kwargs):
+    """GET through the shared session, defaults to the configured connect/read timeouts cut to the deadline."""
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        if deadline is not None:
+            timeout = tuple(max(0.01, deadline.timeout(part)) for part in timeout)
+    _pool_wait.seconds = timeout[0] if isinstance(timeout, tuple) else timeout
+    try:
+        return session.get(url, timeout=timeout, **kwargs)
+    except EmptyPoolError as e:
+        # requests passes urllib3's exhausted pool error through unwrapped
+        raise requests.exceptions.ConnectTimeout(f"No free connection within {_pool_wait.seconds:.2f}s: {e}")
+
+def get_pool_stats():
+    """Return per-host and total pool statistics, reuse_ratio is the share of requests served by a kept-alive connection."""
+    with _stats_lock:
+        hosts = {host: dict(stats) for host, stats in _host_stats.items()}
+
+    def summarize(stats):
+        requests_made = stats["requests"]
+        reused = max(0, requests_made - stats["new_connections"])
+        stats["reuse_ratio"] = round(reused / requests_made, 3) if requests_made else 0.0
+        stats["avg_wait_ms"] = round(stats["wait_time"] * 1000 / requests_made, 2) if requests_made else 0.0
+        stats["wait_time"] = round(stats["wait_time"], 3)
+        stats["max_wait"] = round(stats["max_wait"], 3)
+        return stats
+
+    total = {"requests": 0, "new_connections": 0, "wait_time": 0.0, "max_wait": 0.0}
+    for stats in hosts.values():
+        total["requests"] += stats["requests"]
+        total["new_connections"] += stats["new_connections"]
+        total["wait_time"] += stats["wait_time"]
+        total["max_wait"] = max(total["max_wait"], stats["max_wait"])
+
+    return {
+        "total": summarize(total),
+        "hosts": {host: summarize(stats) for host, stats in hosts.items()},
+    }
@@ -6,6 +6,8 @@ from datetime import datetime, timezone, timedelta
 import re
 import requests
 from settings import get_setting
+from services.connect.http_client import http_get
+from services.cache import single_flight
 
 GMT_PLUS_2 = timezone(timedelta(hours=2))  
 
@@ -28,11 +30,12 @@ def trafiklab_parse_query(query):
     
     return origin, destination
 
+@single_flight(key=lambda stop_name, token: (stop_name.lower().strip(), token))
 def trafiklab_get_stop_id(stop_name, TRAFIKLAB_API_TOKEN):
     url = f"https://api.resrobot.se/v2.1/location.name?input={stop_name}&format=json&accessId={TRAFIKLAB_API_TOKEN}"
     
     try:
-        response = requests.get(url)
+        response = http_get(url)
         response.raise_for_status()  # Will raise an HTTPError for bad responses (4xx or 5xx)
         data = response.json()
     except requests.exceptions.RequestException as e:
@@ -48,11 +51,12 @@ def trafiklab_get_stop_id(stop_name, TRAFIKLAB_API_TOKEN):
     stop_id = stop_locations[0]['extId']
     return stop_id
 
+@single_flight()
 def trafiklab_get_next_route(origin_id, dest_id, TRAFIKLAB_API_TOKEN):
     url = f"https://api.resrobot.se/v2.1/trip?format=json&originId={origin_id}&destId={dest_id}&passlist=0&showPassingPoints=0&numF=3&accessId={TRAFIKLAB_API_TOKEN}"
     
     try:
-        response = requests.get(url)
+        response = http_get(url)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException as e:
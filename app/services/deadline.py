@@ -0,0 +1,60 @@
+# /app/services/deadline.py
+
+print("/app/services/deadline.py has been imported successfully!")
+
+import time
+import threading
+from settings import get_setting
+
+REQUEST_DEADLINE = get_setting("REQUEST_DEADLINE")
+
+
+class Deadline:
+    """
+    Time budget of one request, shared by every stage that runs for it.
+    Stages ask for timeout(cap) before blocking calls and call check(stage) between steps,
+    the first stage that finds the budget spent is remembered in exhausted_stage.
+    A deadline of 0 or less means no limit.
+    """
+    def __init__(self, seconds=None):
+        seconds = REQUEST_DEADLINE if seconds is None else seconds
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds and seconds > 0 else None
+        self.exhausted_stage = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_request(cls, data):
+        """Read an optional 'deadline' in seconds from a request payload, falling back to REQUEST_DEADLINE."""
+        try:
+            return cls(float(data.get('deadline')))
+        except (TypeError, ValueError, AttributeError):
+            return cls()
+
+    def remaining(self):
+        """Seconds left, or None when there is no limit."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def timeout(self, cap):
+        """cap, shortened to what is left of the budget."""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        return min(cap, remaining) if cap is not None else remaining
+
+    def exhaust(self, stage):
+        with self._lock:
+            if self.exhausted_stage is None:
+                self.exhausted_stage = stage
+
+    def check(self, stage):
+        """True if the budget is spent, recording stage as the one that ran out."""
+        if self.expired():
+            self.exhaust(stage)
+            return True
+        return False
@@ -0,0 +1,37 @@
+# /app/services/progress.py
+
+print("/app/services/progress.py has been imported successfully!")
+
+import queue
+
+DONE = object()
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event, every line of data gets its own data: field."""
+    lines = "".join(f"data: {line}\n" for line in str(data).split("\n"))
+    return f"event: {event}\n{lines}\n"
+
+class ProgressStream:
+    """
+    Progress of one request as Server-Sent Events.
+    The handler thread calls emit() for status, site and partial events and finish() with the
+    final answer, the response iterates events() and ends after the answer event.
+    Stages take it as an optional progress argument and skip reporting when it is None.
+    """
+    def __init__(self):
+        self._events = queue.Queue()
+
+    def emit(self, event, data):
+        self._events.put(sse_event(event, data))
+
+    def finish(self, answer, event="answer"):
+        self.emit(event, answer)
+        self._events.put(DONE)
+
+    def events(self):
+        while True:
+            item = self._events.get()
+            if item is DONE:
+                return
+            yield item
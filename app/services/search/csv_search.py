@@ -0,0 +1,97 @@
+# /app/services/search/csv_search.py
+
+print("/app/services/search/csv_search.py has been imported successfully!")
+
+import csv
+import sys
+import logging
+import itertools
+from collections import deque
+
+SNIFF_BYTES = 64 * 1024
+CELL_SEPARATOR = " | "
+CHUNK_ROWS = 2000
+
+# Exports with long free-text columns pass the module's default 128 KB cell limit
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+
+def sniff_dialect(file):
+    """The dialect of an open CSV file, comma separated when it can't be told from the first rows."""
+    sample = file.read(SNIFF_BYTES)
+    file.seek(0)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        return csv.excel
+
+def format_row(row):
+    """A row on one line, so indexed line numbers stay those of the rows."""
+    return CELL_SEPARATOR.join(" ".join(cell.split()) for cell in row)
+
+def read_csv_rows(file_path):
+    """Yield (line_no, row) for every row, line_no being the line the row starts on."""
+    with open(file_path, 'r', encoding='utf-8', errors='replace', newline='') as file:
+        reader = csv.reader(file, sniff_dialect(file))
+        line_no = 0
+        try:
+            for row in reader:
+                yield line_no, row
+                line_no = reader.line_num
+        except csv.Error as e:
+            logging.error(f"Stopped reading {file_path} at line {line_no}: {e}")
+
+def read_csv_text(file_path):
+    """One line per row with the cells separated by CELL_SEPARATOR, for indexing."""
+    return "\n".join(format_row(row) for _, row in read_csv_rows(file_path))
+
+def csv_search(file_path, search_term, context_rows):
+    """
+    Yield (line_no, context) for every row with a cell containing search_term, case-insensitively.
+    Rows are streamed with the csv module in chunks of CHUNK_ROWS, a chunk without the term in
+    any cell is skipped with one string search. Only the current chunk and the context windows
+    are held, so memory use does not grow with file size. The context is the header followed
+    by the surrounding rows.
+    """
+    needle = search_term.casefold()
+    rows = read_csv_rows(file_path)
+    header = next(rows, None)
+    if header is None:
+        return
+    header_text = format_row(header[1])
+    if any(needle in cell.casefold() for cell in header[1]):
+        yield header[0], header_text
+
+    before = deque(maxlen=context_rows)
+    waiting = []  # [line_no, rows so far, rows still to collect] for matches that need following rows
+
+    def render(lines):
+        return "\n".join([header_text] + [format_row(row) for row in lines])
+
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK_ROWS))
+        if not chunk:
+            break
+        # NUL never occurs in a term, joining on it keeps matches within a cell
+        if not waiting and needle not in "\0".join(cell for _, row in chunk for cell in row).casefold():
+            before.extend(row for _, row in chunk[-context_rows:] if context_rows)
+            continue
+
+        for line_no, row in chunk:
+            for match in waiting:
+                match[1].append(row)
+                match[2] -= 1
+            while waiting and waiting[0][2] <= 0:
+                match_line, lines, _ = waiting.pop(0)
+                yield match_line, render(lines)
+
+            if any(needle in cell.casefold() for cell in row):
+                lines = list(before) + [row]
+                if context_rows > 0:
+                    waiting.append([line_no, lines, context_rows])
+                else:
+                    yield line_no, render(lines)
+            before.append(row)
+
+    for match_line, lines, _ in waiting:
+        yield match_line, render(lines)
@@ -0,0 +1,314 @@
+# /app/services/search/doc_index.py
+
+print("/app/services/search/doc_index.py has been imported successfully!")
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SCHEMA_VERSION = 2
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class DocumentIndex:
+    """
+    On-disk inverted index of the extracted text of documents.
+    Every line of a document is stored with its line number, and every token points at its
+    word positions in the file and the lines they are on, so a search reads neither the files
+    nor their extracted text again. Positions run on across line breaks, see phrase_spans().
+    Files are re-extracted only when their mtime and size changed and their content hash differs.
+    Search keeps the original semantics: a case-insensitive substring match on a single line.
+    Files for which stream(path, stat) is true are only registered, without lines, and
+    are searched by streaming them instead, see streamed_files().
+    """
+    def __init__(self, db_path, stream=None):
+        self.stream = stream
+        self._changes = 0
+        self._lock = threading.RLock()
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Document index could not open {db_path}, indexing in memory: {e}")
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys=ON")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.executescript(
+                "DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS positions; DROP TABLE IF EXISTS lines; "
+                "DROP TABLE IF EXISTS terms; DROP TABLE IF EXISTS files;"
+            )
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime REAL NOT NULL, size INTEGER NOT NULL, "
+            "hash TEXT NOT NULL, line_count INTEGER NOT NULL, indexed_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS lines ("
+            "file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE, line_no INTEGER NOT NULL, "
+            "text TEXT NOT NULL, PRIMARY KEY (file_id, line_no)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT UNIQUE NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS positions ("
+            "term_id INTEGER NOT NULL, file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE, "
+            "position INTEGER NOT NULL, line_no INTEGER NOT NULL, PRIMARY KEY (term_id, file_id, position)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS positions_file ON positions (file_id);"
+            f"PRAGMA user_version = {SCHEMA_VERSION};"
+        )
+        self._db.commit()
+
+    def _term_ids(self, terms):
+        self._db.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", ((term,) for term in terms))
+        ids = {}
+        terms = list(terms)
+        for start in range(0, len(terms), 500):
+            batch = terms[start:start + 500]
+            rows = self._db.execute(f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch)
+            ids.update(rows)
+        return ids
+
+    def add(self, path, mtime, size, digest, text):
+        """Replace the indexed content of path with text."""
+        lines = text.split('\n')
+        line_terms = [tokenize(line) for line in lines]
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+            file_id = self._db.execute(
+                "INSERT INTO files (path, mtime, size, hash, line_count, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, mtime, size, digest, len(lines), time.time()),
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO lines (file_id, line_no, text) VALUES (?, ?, ?)",
+                ((file_id, line_no, line) for line_no, line in enumerate(lines)),
+            )
+            term_ids = self._term_ids(set().union(*line_terms))
+            positioned = ((line_no, term) for line_no, terms in enumerate(line_terms) for term in terms)
+            self._db.executemany(
+                "INSERT INTO positions (term_id, file_id, position, line_no) VALUES (?, ?, ?, ?)",
+                ((term_ids[term], file_id, position, line_no) for position, (line_no, term) in enumerate(positioned)),
+            )
+            self._db.commit()
+            self._changes += 1
+
+    def add_streamed(self, path, stat):
+        """Register a file that is searched by streaming, line_count -1 marks it."""
+        with self._lock:
+            self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+            self._db.execute(
+                "INSERT INTO files (path, mtime, size, hash, line_count, indexed_at) VALUES (?, ?, ?, '', -1, ?)",
+                (path, stat.st_mtime, stat.st_size, time.time()),
+            )
+            self._db.commit()
+            self._changes += 1
+
+    @property
+    def generation(self):
+        """Changes whenever indexed content changes, in this process or through another connection."""
+        with self._lock:
+            return self._changes, self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def all_lines(self):
+        """Every indexed (file_id, path, line_no, text)."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT l.file_id, f.path, l.line_no, l.text FROM lines l JOIN files f ON f.id = l.file_id ORDER BY f.path, l.line_no"
+            ).fetchall()
+
+    def streamed_files(self, directory=None):
+        """(path, mtime) of the registered streamed files, newest first."""
+        prefix = os.path.join(directory or '', '')
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, mtime FROM files WHERE line_count = -1 AND substr(path, 1, length(?)) = ? ORDER BY mtime DESC, path",
+                (prefix, prefix) if directory else ('', ''),
+            ).fetchall()
+        return rows
+
+    def remove(self, path):
+        """Drop a file, or every file under a directory, from the index."""
+        prefix = os.path.join(path, '')
+        with self._lock:
+            if self._db.execute("DELETE FROM files WHERE path = ? OR substr(path, 1, length(?)) = ?", (path, prefix, prefix)).rowcount:
+                self._changes += 1
+            self._db.commit()
+
+    def update(self, path, extract):
+        """Re-index a single file if its content changed, returns True when it was (re)indexed."""
+        try:
+            stat = os.stat(path)
+            with self._lock:
+                previous = self._db.execute("SELECT mtime, size, hash FROM files WHERE path = ?", (path,)).fetchone()
+            if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                return False
+            if self.stream and self.stream(path, stat):
+                self.add_streamed(path, stat)
+                return False
+            digest = file_hash(path)
+            if previous and previous[2] == digest:
+                with self._lock:
+                    self._db.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?", (stat.st_mtime, stat.st_size, path))
+                    self._db.commit()
+                return False
+            text = extract(path)
+        except FileNotFoundError:
+            self.remove(path)
+            return False
+        except Exception as e:
+            logging.error(f"Could not index {path}: {e}")
+            return False
+        if text is None:
+            return False
+        self.add(path, stat.st_mtime, stat.st_size, digest, text)
+        return True
+
+    def pending(self, directory, extensions):
+        """
+        Compare the files under directory with the index and return (path, stat, digest) for
+        every new or changed file. Files whose content is unchanged only get their mtime and
+        size updated, files that no longer exist are removed from the index.
+        """
+        prefix = os.path.join(directory, '')
+        with self._lock:
+            known = {
+                row[0]: row[1:] for row in
+                self._db.execute("SELECT path, mtime, size, hash FROM files WHERE substr(path, 1, length(?)) = ?",
+                                 (prefix, prefix))
+            }
+        changed = []
+        for root, dirs, files in os.walk(directory):
+            for file_name in files:
+                file_path = os.path.join(root, file_name)
+                if not file_path.endswith(extensions):
+                    continue
+                try:
+                    stat = os.stat(file_path)
+                    previous = known.pop(file_path, None)
+                    if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                        continue
+                    if self.stream and self.stream(file_path, stat):
+                        self.add_streamed(file_path, stat)
+                        continue
+                    digest = file_hash(file_path)
+                except OSError as e:
+                    logging.error(f"Could not index {file_path}: {e}")
+                    continue
+                if previous and previous[2] == digest:
+                    with self._lock:
+                        self._db.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                                         (stat.st_mtime, stat.st_size, file_path))
+                        self._db.commit()
+                    continue
+                changed.append((file_path, stat, digest))
+
+        for removed_path in known:
+            self.remove(removed_path)
+        return changed
+
+    def refresh(self, directory, extract, extensions):
+        """
+        Bring the index up to date with the files under directory.
+        extract(path) returns the text of a file, or None to leave it out.
+        Returns the number of files that were (re)indexed.
+        """
+        indexed = 0
+        for file_path, stat, digest in self.pending(directory, extensions):
+            try:
+                text = extract(file_path)
+            except Exception as e:
+                logging.error(f"Could not index {file_path}: {e}")
+                continue
+            if text is None:
+                continue
+            self.add(file_path, stat.st_mtime, stat.st_size, digest, text)
+            indexed += 1
+        return indexed
+
+    def search(self, search_term, directory=None, newest_first=False):
+        """
+        (file_id, path, line_no, text, mtime) of every line containing search_term, case-insensitively,
+        in path and line order, or with the most recently changed files first when newest_first.
+        """
+        needle = search_term.lower()
+        tokens = sorted(set(tokenize(needle)), key=len, reverse=True)
+        where = []
+        params = []
+        if tokens:
+            # Every query token lies inside some token of a matching line, candidates come from the postings
+            candidates = " INTERSECT ".join(
+                "SELECT file_id, line_no FROM positions WHERE term_id IN (SELECT id FROM terms WHERE instr(term, ?) > 0)"
+                for _ in tokens
+            )
+            where.append(f"(l.file_id, l.line_no) IN ({candidates})")
+            params.extend(tokens)
+        if directory:
+            prefix = os.path.join(directory, '')
+            where.append("substr(f.path, 1, length(?)) = ?")
+            params.extend([prefix, prefix])
+
+        sql = (
+            "SELECT l.file_id, f.path, l.line_no, l.text, f.mtime FROM lines l JOIN files f ON f.id = l.file_id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + (" ORDER BY f.mtime DESC, f.path, l.line_no" if newest_first else " ORDER BY f.path, l.line_no")
+        )
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [row for row in rows if needle in row[3].lower()]
+
+    def phrase_spans(self, terms, directory=None):
+        """
+        (file_id, path, mtime, start, end, line_no, end_line_no) of every occurrence of the exact
+        token sequence terms, also where it wraps onto the next line. start and end are word
+        positions in the file. The positions of all terms are joined in SQL, nothing is rescanned.
+        """
+        if not terms:
+            return []
+        with self._lock:
+            ids = dict(self._db.execute(
+                f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(set(terms)))})", list(set(terms))
+            ).fetchall())
+            if len(ids) < len(set(terms)):
+                return []
+            joins = "".join(
+                f" JOIN positions p{i} ON p{i}.file_id = p0.file_id AND p{i}.position = p0.position + {i} AND p{i}.term_id = ?"
+                for i in range(1, len(terms))
+            )
+            where = "p0.term_id = ?"
+            params = [ids[term] for term in terms[1:]] + [ids[terms[0]]]
+            if directory:
+                prefix = os.path.join(directory, '')
+                where += " AND substr(f.path, 1, length(?)) = ?"
+                params.extend([prefix, prefix])
+            last = len(terms) - 1
+            return self._db.execute(
+                f"SELECT p0.file_id, f.path, f.mtime, p0.position, p{last}.position, p0.line_no, p{last}.line_no "
+                f"FROM positions p0{joins} JOIN files f ON f.id = p0.file_id WHERE {where} ORDER BY f.path, p0.position",
+                params,
+            ).fetchall()
+
+    def context(self, file_id, line_no, context_lines, end_line_no=None):
+        """The lines line_no to end_line_no with up to context_lines lines on either side, joined and stripped."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT text FROM lines WHERE file_id = ? AND line_no BETWEEN ? AND ? ORDER BY line_no",
+                (file_id, line_no - context_lines, max(line_no, end_line_no or line_no) + context_lines),
+            ).fetchall()
+        return "\n".join(row[0] for row in rows).strip()
+
+    def stats(self):
+        with self._lock:
+            files, lines, streamed = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(MAX(line_count, 0)), 0), COALESCE(SUM(line_count = -1), 0) FROM files"
+            ).fetchone()
+            terms = self._db.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {"files": files, "lines": lines, "terms": terms, "streamed_files": streamed}
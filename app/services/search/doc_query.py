@@ -0,0 +1,121 @@
+# /app/services/search/doc_query.py
+
+print("/app/services/search/doc_query.py has been imported successfully!")
+
+import re
+import bisect
+from collections import defaultdict
+from services.search.doc_index import tokenize
+
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20, "fifty": 50, "hundred": 100,
+}
+NEAR_WORDS = 10
+
+
+def parse_query(text):
+    """
+    Parse a document query into OR groups of AND clauses, returns (groups, structured).
+    A clause is (phrase, within, other): phrase and other are token tuples and within is the
+    most words allowed between them, None for a plain phrase. Understood are "or", "and",
+    "a within N words of b", "a near b" (within NEAR_WORDS) and "quoted phrases", in which
+    operator words are just words. structured is False for a query without any of them.
+    """
+    groups = [[]]
+    words = []
+    proximity = None  # (left phrase, within) while the right side is read
+    structured = False
+
+    def close_clause():
+        nonlocal words, proximity
+        phrase = tuple(words)
+        if proximity and proximity[0] and phrase:
+            groups[-1].append((proximity[0], proximity[1], phrase))
+        elif proximity and proximity[0]:
+            groups[-1].append((proximity[0], None, None))
+        elif phrase:
+            groups[-1].append((phrase, None, None))
+        words, proximity = [], None
+
+    parts = [(quoted, word) for quoted, word in QUERY_TOKEN.findall(text.lower())]
+    i = 0
+    while i < len(parts):
+        quoted, word = parts[i]
+        i += 1
+        if not word:
+            words.extend(tokenize(quoted))
+            structured = True
+        elif word == "or":
+            close_clause()
+            groups.append([])
+            structured = True
+        elif word == "and":
+            close_clause()
+            structured = True
+        elif word == "near" and words and not proximity:
+            proximity = (tuple(words), NEAR_WORDS)
+            words = []
+            structured = True
+        elif word == "within" and words and not proximity and i < len(parts) and _number(parts[i][1]) is not None:
+            within = _number(parts[i][1])
+            i += 1
+            if i < len(parts) and parts[i][1] in ("word", "words"):
+                i += 1
+            if i < len(parts) and parts[i][1] == "of":
+                i += 1
+            proximity = (tuple(words), within)
+            words = []
+            structured = True
+        else:
+            words.extend(tokenize(word))
+    close_clause()
+    return [group for group in groups if group], structured
+
+def _number(word):
+    if word.isdigit():
+        return int(word)
+    return NUMBER_WORDS.get(word)
+
+def _clause_spans(index, clause, directory):
+    """(file_id, path, mtime, start, end, line_no, end_line_no, matched_words) for one clause."""
+    phrase, within, other = clause
+    spans = index.phrase_spans(list(phrase), directory)
+    if within is None:
+        return [span + (len(phrase),) for span in spans]
+
+    others = defaultdict(list)
+    for span in index.phrase_spans(list(other), directory):
+        others[span[0]].append(span)
+    length = len(other)
+    hits = []
+    for span in spans:
+        candidates = others.get(span[0])
+        if not candidates:
+            continue
+        starts = [candidate[3] for candidate in candidates]
+        # other may end at most `within` words before phrase starts, or start at most `within` words after it ends
+        before = (span[3] - within - length, span[3] - length)
+        after = (span[4] + 1, span[4] + 1 + within)
+        for low, high in (before, after):
+            for candidate in candidates[bisect.bisect_left(starts, low):bisect.bisect_right(starts, high)]:
+                first, last = (candidate, span) if candidate[3] < span[3] else (span, candidate)
+                hits.append(span[:3] + (first[3], last[4], first[5], last[6], len(phrase) + length))
+    return hits
+
+def evaluate(index, groups, directory=None):
+    """
+    The spans matching parsed groups, as (file_id, path, mtime, start, end, line_no, end_line_no,
+    matched_words). All clauses of a group have to match in the same file, a file matching
+    several groups has the spans of each.
+    """
+    hits = {}
+    for group in groups:
+        clause_hits = [_clause_spans(index, clause, directory) for clause in group]
+        files = set.intersection(*({hit[0] for hit in spans} for spans in clause_hits))
+        for spans in clause_hits:
+            for hit in spans:
+                if hit[0] in files:
+                    hits.setdefault((hit[0], hit[3], hit[4]), hit)
+    return sorted(hits.values(), key=lambda hit: (hit[1], hit[3]))
@@ -2,65 +2,240 @@
 
 print("/app/services/search/documents.py has been imported successfully!")
 import os
+import re
+import time
+import heapq
+import itertools
 import fitz
 from settings import get_setting
-import pandas as pd
 from markdown2 import markdown
 from rapidfuzz import fuzz, process
+from services.search.doc_index import DocumentIndex
+from services.search.doc_query import parse_query, evaluate
+from services.search.stream_search import stream_search
+from services.search.csv_search import csv_search, read_csv_text
+from services.search.fuzzy_docs import FuzzyLines
+from services.search.text_cache import text_cache
+from services.watcher import is_watched
 
+CACHE_DIR = get_setting("CACHE_DIR")
+DOCS_STREAM_MIN_BYTES = get_setting("DOCS_STREAM_MIN_BYTES")
+DOCS_FUZZY_SEARCH = get_setting("DOCS_FUZZY_SEARCH")
+DOCS_RESULT_LIMIT = get_setting("DOCS_RESULT_LIMIT")
+DOCS_RECENCY_HALF_LIFE = get_setting("DOCS_RECENCY_HALF_LIFE")
+DOCS_MAX_HITS = get_setting("DOCS_MAX_HITS")
+DOCUMENTS_DIR = '/app/app/Media/Documents'
+STREAM_EXTENSIONS = ('.txt', '.csv')
+
+# Weights of the parts of a match score, see score_match
+PHRASE_WEIGHT = 0.5
+DENSITY_WEIGHT = 0.3
+RECENCY_WEIGHT = 0.2
+
+def is_streamed(file_path, stat):
+    """Large text files are scanned memory-mapped at query time instead of being indexed line by line."""
+    return DOCS_STREAM_MIN_BYTES > 0 and stat.st_size >= DOCS_STREAM_MIN_BYTES and file_path.endswith(STREAM_EXTENSIONS)
+
+document_index = DocumentIndex(os.path.join(CACHE_DIR, "documents.sqlite"), stream=is_streamed)
+fuzzy_lines = FuzzyLines(document_index)
 
 def read_text_file(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
 
 def read_pdf(file_path):
-    text = ""
-    doc = fitz.open(file_path)
-    for page in doc:
-        text += page.get_text()
-    return text
+    with fitz.open(file_path) as doc:
+        return "".join(page.get_text() for page in doc)
 
 def read_csv(file_path):
-    df = pd.read_csv(file_path)
-    return df.to_string()
+    return read_csv_text(file_path)
 
 def read_markdown(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         html = markdown(file.read())
         return html
 
-def search_documents(query, directory='/app/app/Media/Documents'):
+READERS = {
+    '.txt': read_text_file,
+    '.pdf': read_pdf,
+    '.csv': read_csv,
+    '.md': read_markdown,
+}
+DOCUMENT_EXTENSIONS = tuple(READERS)
+
+def read_document(file_path):
+    """The searchable text of a document, None for unsupported file types."""
+    reader = READERS.get(os.path.splitext(file_path)[1])
+    return reader(file_path) if reader else None
+
+# read_document behind the text cache, unchanged files never reach PyMuPDF or markdown2 again
+extract_text = text_cache.cached(read_document)
+
+def indexed_context(file_id, path, line_no, context_lines, end_line_no=None):
+    """The lines around an indexed match, headed by the column names for a CSV row."""
+    context = document_index.context(file_id, line_no, context_lines, end_line_no)
+    if path.endswith('.csv') and line_no > context_lines:
+        context = document_index.context(file_id, 0, 0) + "\n" + context
+    return context
+
+def phrase_pattern(search_term):
+    """Matches search_term as whole words, case-insensitively."""
+    return re.compile(r"(?<!\w)" + re.escape(search_term) + r"(?!\w)", re.IGNORECASE)
+
+def recency(mtime, now=None):
+    """1.0 for a file changed just now, halving every DOCS_RECENCY_HALF_LIFE days."""
+    age_days = max(0.0, ((now or time.time()) - mtime) / 86400)
+    return 0.5 ** (age_days / DOCS_RECENCY_HALF_LIFE)
+
+def score_match(line, search_term, phrase, mtime):
+    """
+    Score of a line containing search_term: an exact whole-word phrase match beats a match
+    inside a longer word, lines mostly made up of the term beat long lines mentioning it once,
+    and newer files beat older ones.
+    """
+    occurrences = line.lower().count(search_term.lower())
+    density = min(1.0, occurrences * len(search_term) / max(len(line.strip()), 1))
+    exact = 1.0 if phrase.search(line) else 0.5
+    return round(PHRASE_WEIGHT * exact + DENSITY_WEIGHT * density + RECENCY_WEIGHT * recency(mtime), 4)
+
+class TopHits:
+    """The best `size` hits seen so far, on a min-heap of (score, order, hit)."""
+    def __init__(self, size):
+        self.size = size
+        self._heap = []
+        self._order = itertools.count()
+        self.seen = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def full(self):
+        return len(self._heap) >= self.size
+
+    def settled(self, best_possible):
+        """True once further hits scoring at most best_possible can't change the result, or enough hits were scored."""
+        return self.full() and (self.floor() >= best_possible or self.seen >= DOCS_MAX_HITS)
+
+    def floor(self):
+        return self._heap[0][0] if self.full() else 0.0
+
+    def push(self, score, hit):
+        self.seen += 1
+        entry = (score, -next(self._order), hit)  # on equal scores the earlier hit wins
+        if not self.full():
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def ranked(self):
+        """(score, hit) best first."""
+        return [(score, hit) for score, _, hit in sorted(self._heap, reverse=True)]
+
+def _whole_number(value, name):
+    """value as an int, ValueError for anything that isn't a whole number such as "abc", 2.5 or [1]."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{name} must be a whole number.")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number.")
+    if not number.is_integer():
+        raise ValueError(f"{name} must be a whole number.")
+    return int(number)
+
+def rank_documents(query, directory=DOCUMENTS_DIR, limit=None, offset=0, fuzzy=None):
+    """
+    One page of document matches, best first, as {"results": [{"path", "line", "score", "context"}],
+    "offset", "limit", "has_more"}. Lines are 1-based. Only the best offset + limit + 1 hits are
+    kept, context is looked up just for the returned page, and indexed and streamed files are
+    searched newest first until no hit in the remaining files could outscore the kept ones, or
+    DOCS_MAX_HITS matches were scored. limit and offset have to be whole numbers, ValueError
+    otherwise.
+    A multi-word query also matches its words as a phrase wrapping onto the next line. Queries
+    with "quotes", or, and, near or "within N words of" are also answered from the positional
+    index, see parse_query, but the query is always searched for literally as well, so
+    "salt and pepper" still finds the phrase. Operator matches score below any whole-word
+    literal match, and streamed files are only searched literally.
+    fuzzy is 'off', 'fallback' (only when nothing matches exactly) or 'always' (typo tolerant
+    matches added, scored below whole-word matches), DOCS_FUZZY_SEARCH by default. Fuzzy
+    matching covers the indexed, not the streamed, files.
+    """
     DOCS_CONTEXT_LINES = get_setting("DOCS_CONTEXT_LINES")
+    fuzzy = fuzzy or DOCS_FUZZY_SEARCH
+    limit = max(1, _whole_number(limit or DOCS_RESULT_LIMIT, "limit"))
+    offset = max(0, _whole_number(offset or 0, "offset"))
 
     search_term = query.strip()
     if not search_term:
         raise ValueError("The search term cannot be empty.")
-    
-    results = []
-    
-    for root, dirs, files in os.walk(directory):
-        for file_name in files:
-            file_path = os.path.join(root, file_name)
-            
-            if file_path.endswith('.txt'):
-                content = read_text_file(file_path)
-            elif file_path.endswith('.pdf'):
-                content = read_pdf(file_path)
-            elif file_path.endswith('.csv'):
-                content = read_csv(file_path)
-            elif file_path.endswith('.md'):
-                content = read_markdown(file_path)
+
+    # Only new and changed files are extracted, the search itself runs on the index.
+    # A watched directory is kept current by the watcher and needs no walk at all.
+    if not is_watched(directory):
+        document_index.refresh(directory, extract_text, DOCUMENT_EXTENSIONS)
+
+    now = time.time()
+    groups, structured = parse_query(search_term)
+    if structured:
+        # Quotes only group words, the literal search looks for what is between them
+        search_term = " ".join(search_term.replace('"', ' ').split()) or search_term
+    phrase = phrase_pattern(search_term)
+    top = TopHits(offset + limit + 1)
+    seen = set()
+    for file_id, path, line_no, text, mtime in document_index.search(search_term, directory, newest_first=True):
+        # Same early stop as for streamed files below, lines come newest file first
+        if top.settled(PHRASE_WEIGHT + DENSITY_WEIGHT + RECENCY_WEIGHT * recency(mtime, now)):
+            break
+        top.push(score_match(text, search_term, phrase, mtime), (path, line_no, file_id, None, line_no))
+        seen.add((path, line_no))
+    if structured or (groups and len(groups[0][0][0]) > 1):
+        for file_id, path, mtime, start, end, line_no, end_line_no, matched in evaluate(document_index, groups, directory):
+            if (path, line_no) in seen:
+                continue
+            seen.add((path, line_no))
+            # Every word of a phrase matched exactly, proximity matches score by how close they are
+            closeness = matched / (end - start + 1)
+            if structured:
+                # At most PHRASE_WEIGHT, below every whole-word literal match, which also has some density
+                score = PHRASE_WEIGHT * (DENSITY_WEIGHT * closeness + RECENCY_WEIGHT * recency(mtime, now)) / (DENSITY_WEIGHT + RECENCY_WEIGHT)
             else:
+                score = PHRASE_WEIGHT + DENSITY_WEIGHT * closeness + RECENCY_WEIGHT * recency(mtime, now)
+            top.push(round(score, 4), (path, line_no, file_id, None, end_line_no))
+
+    for path, mtime in document_index.streamed_files(directory):
+        # The best score any line of this file can reach, files come newest first
+        best_possible = PHRASE_WEIGHT + DENSITY_WEIGHT + RECENCY_WEIGHT * recency(mtime, now)
+        if top.settled(best_possible):
+            break
+        search = csv_search if path.endswith('.csv') else stream_search
+        for line_no, context in search(path, search_term, DOCS_CONTEXT_LINES):
+            # The context doesn't say which of its lines matched, score the first one containing the term
+            line = next((line for line in context.splitlines() if search_term.lower() in line.lower()), context)
+            top.push(score_match(line, search_term, phrase, mtime), (path, line_no, None, context, line_no))
+            if top.settled(best_possible):
+                break
+
+    if fuzzy == 'always' or (fuzzy == 'fallback' and not top):
+        seen = {(path, line_no) for _, (path, line_no, _, _, _) in top.ranked()}
+        for score, file_id, path, line_no in fuzzy_lines.search(search_term, directory_prefix=os.path.join(directory, '')):
+            if (path, line_no) in seen:
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
                 continue
-            
-            lines = content.split('\n')
-            for i, line in enumerate(lines):
-                if search_term.lower() in line.lower():
-                    start = max(0, i - DOCS_CONTEXT_LINES)
-                    end = min(len(lines), i + DOCS_CONTEXT_LINES + 1)
-                    context = "\n".join(lines[start:end]).strip()
-                    results.append(context)
-    
-    return "\n\n---\n\n".join(results)
+            fuzzy_score = PHRASE_WEIGHT * 0.5 * score / 100 + RECENCY_WEIGHT * recency(mtime, now)
+            top.push(round(fuzzy_score, 4), (path, line_no, file_id, None, line_no))
 
+    ranked = top.ranked()
+    page = []
+    for score, (path, line_no, file_id, context, end_line_no) in ranked[offset:offset + limit]:
+        if context is None:
+            context = indexed_context(file_id, path, line_no, DOCS_CONTEXT_LINES, end_line_no)
+        page.append({"path": path, "line": line_no + 1, "score": score, "context": context})
+    return {"results": page, "offset": offset, "limit": limit, "has_more": len(ranked) > offset + limit}
 
+def search_documents(query, directory=DOCUMENTS_DIR, fuzzy=None, limit=None, offset=0):
+    """The context blocks of the best ranked matches for query, see rank_documents."""
+    page = rank_documents(query, directory, limit, offset, fuzzy)
+    return "\n\n---\n\n".join(result["context"] for result in page["results"])
@@ -0,0 +1,87 @@
+# /app/services/search/exif.py
+
+print("/app/services/search/exif.py has been imported successfully!")
+
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from settings import get_setting
+
+PHOTO_EXIF_WORKERS = get_setting("PHOTO_EXIF_WORKERS")
+
+EXIF_IFD_POINTER = 0x8769
+DATE_TIME_ORIGINAL = 0x9003
+ASCII = 2
+MAX_SEGMENTS = 32
+
+
+def read_app1(file):
+    """The TIFF block of a JPEG's Exif APP1 segment, None when it has none. Stops at the image data."""
+    if file.read(2) != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    for _ in range(MAX_SEGMENTS):
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:  # fill bytes before a marker
+            marker = marker[1:] + file.read(1)
+            if len(marker) < 2:
+                raise ValueError("truncated header: ends in fill bytes")
+        if marker[1] in (0xD9, 0xDA):  # end of image, start of scan
+            return None
+        length = file.read(2)
+        if len(length) < 2:
+            raise ValueError("truncated header: no segment length")
+        length = struct.unpack(">H", length)[0]
+        if marker[1] == 0xE1:
+            segment = file.read(length - 2)
+            if segment.startswith(b"Exif\0\0"):
+                return segment[6:]
+        else:
+            file.seek(length - 2, os.SEEK_CUR)
+    return None
+
+def _ifd_entries(tiff, offset, order):
+    count = struct.unpack_from(order + "H", tiff, offset)[0]
+    for index in range(count):
+        yield struct.unpack_from(order + "HHI4s", tiff, offset + 2 + index * 12)
+
+def date_time_original(tiff):
+    """DateTimeOriginal ("YYYY:MM:DD HH:MM:SS") from a TIFF block, None when it isn't there."""
+    order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if order is None:
+        raise ValueError("bad TIFF byte order")
+    ifd0 = struct.unpack_from(order + "I", tiff, 4)[0]
+    exif_ifd = next((struct.unpack(order + "I", value)[0] for tag, _, _, value in _ifd_entries(tiff, ifd0, order)
+                     if tag == EXIF_IFD_POINTER), None)
+    if exif_ifd is None:
+        return None
+    for tag, kind, count, value in _ifd_entries(tiff, exif_ifd, order):
+        if tag == DATE_TIME_ORIGINAL and kind == ASCII:
+            # Values longer than 4 bytes are stored elsewhere, value holds their offset
+            data = value[:count] if count <= 4 else tiff[struct.unpack(order + "I", value)[0]:][:count]
+            return data.split(b"\0")[0].decode('ascii', errors='replace').strip() or None
+    return None
+
+def read_date_taken(path):
+    """
+    The date part of DateTimeOriginal ("YYYY:MM:DD") read straight from a JPEG's header,
+    only the segment headers and the Exif block are read, the image itself never is.
+    Raises ValueError for files that aren't JPEGs or have a malformed Exif block.
+    """
+    try:
+        with open(path, 'rb') as file:
+            tiff = read_app1(file)
+        taken = date_time_original(tiff) if tiff is not None else None
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"truncated header: {e}")
+    return taken.split(" ")[0] if taken else None
+
+def read_dates(paths, read_date, workers=None):
+    """read_date(path) for every path on a thread pool of PHOTO_EXIF_WORKERS threads, in order."""
+    workers = workers or PHOTO_EXIF_WORKERS or min(32, (os.cpu_count() or 1) * 4)
+    paths = list(paths)
+    if workers <= 1 or len(paths) <= 1:
+        return [read_date(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths)), thread_name_prefix="exif") as pool:
+        return list(pool.map(read_date, paths))
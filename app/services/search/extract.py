@@ -0,0 +1,180 @@
+# /app/services/search/extract.py
+
+print("/app/services/search/extract.py has been imported successfully!")
+
+import re
+import logging
+from collections import namedtuple
+from bs4 import BeautifulSoup
+from lxml import etree
+from settings import get_setting
+
+HTML_PARSER = get_setting("HTML_PARSER")
+MAX_PAGE_BYTES = get_setting("MAX_PAGE_BYTES")
+CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# candidates: texts worth scoring, complete: False if extraction stopped early on a hit,
+# because the deadline ran out or because the fetch was stopped, body: the bytes that were read (capped at MAX_PAGE_BYTES)
+Extraction = namedtuple('Extraction', ['candidates', 'complete', 'body'])
+
+
+def is_html_response(response):
+    """Check the Content-Type header before any of the body is downloaded."""
+    content_type = response.headers.get('Content-Type', '').lower()
+    return not content_type or content_type.startswith(HTML_CONTENT_TYPES)
+
+def response_charset(response):
+    match = re.search(r'charset=([\w-]+)', response.headers.get('Content-Type', ''), re.IGNORECASE)
+    return match.group(1) if match else None
+
+def sniff_charset(head):
+    """Charset declared in a <meta> tag of the first chunk, pages without one are assumed to be UTF-8."""
+    match = re.search(rb'<meta[^>]+charset=["\']?([\w-]+)', head[:4096], re.IGNORECASE)
+    return match.group(1).decode('ascii') if match else 'utf-8'
+
+def iter_capped(response, max_bytes=None, deadline=None, cut_short=None, stop_event=None):
+    """
+    Yield the body of a streamed response in chunks, stopping after max_bytes, or when the
+    deadline runs out or stop_event is set, in which case True is appended to the cut_short list.
+    """
+    remaining = max_bytes or MAX_PAGE_BYTES
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if (deadline is not None and deadline.check("page_fetch")) or (stop_event is not None and stop_event.is_set()):
+            if cut_short is not None:
+                cut_short.append(True)
+            break
+        if not chunk:
+            continue
+        yield chunk[:remaining]
+        remaining -= len(chunk)
+        if remaining <= 0:
+            break
+
+class SoupExtractor:
+    """Builds a full BeautifulSoup tree, slow but tolerant of anything."""
+    name = 'html.parser'
+
+    def extract(self, chunks, match=None, encoding=None):
+        body = b"".join(chunks)
+        soup = BeautifulSoup(body, 'html.parser', from_encoding=encoding)
+        candidates = []
+
+        json_ld = soup.find('script', type='application/ld+json')
+        if json_ld:
+            candidates.append(json_ld.get_text())
+
+        for tag in ['meta', 'div', 'span']:
+            for element in soup.find_all(tag):
+                if element.get('content'):
+                    candidates.append(element.get('content').lower())
+
+        candidates.append(soup.get_text().lower())
+        return Extraction(candidates, True, body)
+
+class _CandidateTarget:
+    """lxml parser target collecting JSON-LD, content attributes and visible text without building a tree."""
+    SKIP_TEXT = {'script', 'style', 'template'}
+
+    def __init__(self, match):
+        self.match = match
+        self.json_ld = None
+        self.contents = []
+        self.text = []
+        self.hit = False
+        self._skip_depth = 0
+        self._in_json_ld = False
+        self._json_ld_parts = []
+
+    def start(self, tag, attrib):
+        if self.hit:
+            return
+        if tag in self.SKIP_TEXT:
+            self._skip_depth += 1
+            if tag == 'script' and self.json_ld is None and attrib.get('type', '').lower() == 'application/ld+json':
+                self._in_json_ld = True
+        if tag in ('meta', 'div', 'span') and attrib.get('content'):
+            content = attrib['content'].lower()
+            self.contents.append(content)
+            if self.match and self.match(content):
+                self.hit = True
+
+    def end(self, tag):
+        if tag in self.SKIP_TEXT:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            if self._in_json_ld and tag == 'script':
+                self._in_json_ld = False
+                self.json_ld = "".join(self._json_ld_parts)
+                if self.match and self.match(self.json_ld):
+                    self.hit = True
+
+    def data(self, data):
+        if self._in_json_ld:
+            self._json_ld_parts.append(data)
+        elif not self._skip_depth and not self.hit:
+            self.text.append(data)
+
+    def close(self):
+        candidates = [self.json_ld] if self.json_ld is not None else []
+        candidates.extend(self.contents)
+        candidates.append("".join(self.text).lower())
+        return candidates
+
+class LxmlExtractor:
+    """
+    Single pass over the streamed chunks with lxml's event target, memory stays flat.
+    Candidates come in document order and reading stops at the first JSON-LD or content
+    attribute that satisfies match, the full text is only scored once the page is read.
+    """
+    name = 'lxml'
+
+    def _parser(self, target, encoding):
+        try:
+            return etree.HTMLParser(target=target, encoding=encoding)
+        except LookupError:
+            return etree.HTMLParser(target=target, encoding='utf-8')
+
+    def extract(self, chunks, match=None, encoding=None):
+        target = _CandidateTarget(match)
+        parser = None
+        body = []
+        for chunk in chunks:
+            if parser is None:
+                parser = self._parser(target, encoding or sniff_charset(chunk))
+            body.append(chunk)
+            parser.feed(chunk)
+            if target.hit:
+                break
+        if parser is None:
+            return Extraction(target.close(), True, b"")
+        try:
+            candidates = parser.close()
+        except etree.LxmlError as e:
+            logging.error(f"lxml could not finish parsing the page: {e}")
+            candidates = target.close()
+        return Extraction(candidates, not target.hit, b"".join(body))
+
+EXTRACTORS = {
+    LxmlExtractor.name: LxmlExtractor,
+    SoupExtractor.name: SoupExtractor,
+}
+
+def get_extractor(name=None):
+    name = name or HTML_PARSER
+    if name not in EXTRACTORS:
+        logging.error(f"Unknown HTML_PARSER '{name}', using lxml")
+        name = LxmlExtractor.name
+    return EXTRACTORS[name]()
+
+def extract_from_response(response, match=None, extractor=None, deadline=None, stop_event=None):
+    """Stream a response through the configured extractor, the caller should check is_html_response first."""
+    extractor = extractor or get_extractor()
+    cut_short = []
+    extraction = extractor.extract(iter_capped(response, deadline=deadline, cut_short=cut_short, stop_event=stop_event),
+                                   match, encoding=response_charset(response))
+    # A page the deadline or a stop cut off is not the whole page, whatever the extractor saw
+    return extraction._replace(complete=False) if cut_short else extraction
+
+def extract_from_bytes(body, match=None, extractor=None):
+    extractor = extractor or get_extractor()
+    return extractor.extract([body[:MAX_PAGE_BYTES]], match)
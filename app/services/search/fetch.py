@@ -0,0 +1,89 @@
+# /app/services/search/fetch.py
+
+print("/app/services/search/fetch.py has been imported successfully!")
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+from settings import get_setting
+
+MAX_PARALLEL_FETCHES = get_setting("MAX_PARALLEL_FETCHES")
+MAX_FETCHES_PER_HOST = get_setting("MAX_FETCHES_PER_HOST")
+
+
+def url_host(url):
+    return urlparse(url).netloc.lower()
+
+def fetch_first_hit(urls, inspect, max_workers=None, per_host=None, deadline=None, cancel=None):
+    """
+    Run inspect(url, stop_event) over the urls on a bounded worker pool.
+    Returns (index, answer) for the best ranked url that produced an answer, or None.
+    Urls ranked below a hit are cancelled, urls ranked above it are still awaited
+    so the original rank order decides the winner. When the deadline runs out, or the
+    cancel future resolves, every outstanding fetch is cancelled and the best hit so far is returned.
+    """
+    max_workers = max(1, max_workers or MAX_PARALLEL_FETCHES)
+    per_host = max(1, per_host or MAX_FETCHES_PER_HOST)
+
+    pending = list(range(len(urls)))
+    running = {}     # future -> index
+    stop_events = {}  # index -> threading.Event
+    host_load = {}
+    best = None
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+    try:
+        while True:
+            # Submit in rank order, skipping hosts that already use all their slots
+            for index in list(pending):
+                if len(running) >= max_workers:
+                    break
+                if best is not None and index > best[0]:
+                    pending.remove(index)
+                    continue
+                host = url_host(urls[index])
+                if host_load.get(host, 0) >= per_host:
+                    continue
+                pending.remove(index)
+                host_load[host] = host_load.get(host, 0) + 1
+                stop_events[index] = threading.Event()
+                running[pool.submit(inspect, urls[index], stop_events[index])] = index
+
+            if not running:
+                break
+            if deadline is not None and deadline.check("page_fetch"):
+                break
+            if cancel is not None and cancel.done():
+                break
+
+            waiting_on = set(running) if cancel is None else set(running) | {cancel}
+            done, _ = wait(waiting_on, timeout=deadline.remaining() if deadline else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future is cancel:
+                    continue
+                index = running.pop(future)
+                host_load[url_host(urls[index])] -= 1
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    logging.error(f"Fetch of {urls[index]} failed: {e}")
+                    answer = None
+
+                if answer and (best is None or index < best[0]):
+                    best = (index, answer)
+                    for other_index in running.values():
+                        if other_index > index:
+                            stop_events[other_index].set()
+
+            if best is not None:
+                outranking = [i for i in pending + list(running.values()) if i < best[0]]
+                if not outranking:
+                    break
+    finally:
+        for stop_event in stop_events.values():
+            stop_event.set()
+        # Don't block on cancelled fetches, they exit at their next stop check
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return best
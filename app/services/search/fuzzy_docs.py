@@ -0,0 +1,63 @@
+# /app/services/search/fuzzy_docs.py
+
+print("/app/services/search/fuzzy_docs.py has been imported successfully!")
+
+import threading
+import numpy as np
+from rapidfuzz import process, fuzz
+from settings import get_setting
+
+DOCS_FUZZY_MIN_SCORE = get_setting("DOCS_FUZZY_MIN_SCORE")
+DOCS_FUZZY_TOP_K = get_setting("DOCS_FUZZY_TOP_K")
+DOCS_FUZZY_WORKERS = get_setting("DOCS_FUZZY_WORKERS")
+
+
+def normalize_line(text):
+    return " ".join(text.lower().split())
+
+class FuzzyLines:
+    """
+    Typo tolerant line search over the indexed documents.
+    The normalized lines are loaded from the index once per index generation and scored
+    against the query in one rapidfuzz cdist call (partial_ratio, so a query close to part
+    of a line scores high), spread over DOCS_FUZZY_WORKERS threads.
+    """
+    def __init__(self, index):
+        self.index = index
+        self._lock = threading.Lock()
+        self._generation = None
+        self._keys = []   # (file_id, path, line_no) per line
+        self._lines = []
+
+    def _load(self):
+        with self._lock:
+            if self._generation == self.index.generation:
+                return self._keys, self._lines
+            generation = self.index.generation
+            keys, lines = [], []
+            for file_id, path, line_no, text in self.index.all_lines():
+                normalized = normalize_line(text)
+                if normalized:
+                    keys.append((file_id, path, line_no))
+                    lines.append(normalized)
+            self._keys, self._lines, self._generation = keys, lines, generation
+            return keys, lines
+
+    def search(self, query, k=None, min_score=None, directory_prefix=None):
+        """Up to k (score, file_id, path, line_no) scoring at least min_score, best first."""
+        k = k or DOCS_FUZZY_TOP_K
+        min_score = DOCS_FUZZY_MIN_SCORE if min_score is None else min_score
+        query = normalize_line(query)
+        keys, lines = self._load()
+        if not query or not lines:
+            return []
+
+        scores = process.cdist([query], lines, scorer=fuzz.partial_ratio, score_cutoff=min_score,
+                               workers=DOCS_FUZZY_WORKERS or -1)[0]
+        hits = np.flatnonzero(scores >= max(min_score, 1))
+        if directory_prefix:
+            hits = np.array([i for i in hits if keys[i][1].startswith(directory_prefix)], dtype=np.intp)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        ranked = sorted(hits, key=lambda i: (-scores[i], keys[i][1], keys[i][2]))
+        return [(float(scores[i]), *keys[i]) for i in ranked]
@@ -0,0 +1,210 @@
+# /app/services/search/ingest.py
+# Usage (from /app/app): python -m services.search.ingest [directory] [--workers N] [--timeout SECONDS]
+
+print("/app/services/search/ingest.py has been imported successfully!")
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from settings import get_setting
+from services.search.text_cache import text_cache, text_key
+
+INGEST_WORKERS = get_setting("INGEST_WORKERS")
+INGEST_FILE_TIMEOUT = get_setting("INGEST_FILE_TIMEOUT")
+
+_report_lock = threading.Lock()
+_last_report = {"running": False}
+_started = None  # in a worker process, the queue it announces each file on before extracting it
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+def _extract_worker(file_path, timeout):
+    """Runs in a worker process, returns (text, error). SIGALRM ends extractions that overrun timeout."""
+    from services.search.documents import read_document
+
+    if _started is not None:
+        _started.put(file_path)
+
+    if timeout and hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(max(1, int(timeout)))
+    try:
+        return read_document(file_path), None
+    except ExtractionTimeout:
+        return None, f"timed out after {timeout}s"
+    except Exception as e:
+        return None, str(e)
+    finally:
+        if timeout and hasattr(signal, "SIGALRM"):
+            signal.alarm(0)
+
+def _terminate_workers(pool):
+    """Kill the pool's worker processes, ProcessPoolExecutor has no public way to stop a busy worker."""
+    for process in list(getattr(pool, "_processes", {}).values()):
+        if process.is_alive():
+            process.terminate()
+
+def _extract_round(to_extract, workers, timeout, finish_file):
+    """
+    Extract (path, stat, digest) items on a fresh process pool, passing each result to finish_file.
+    A worker stuck in native code ignores SIGALRM: once nothing finishes for a whole window the
+    files workers had started on are reported as timed out and the workers are killed.
+    Returns (not_started, unsure): the files that never reached a worker, and those handed to one
+    without their start being seen, which may be the file that hung. In a round of a single file
+    that file is the one that hung, so it is reported as timed out and nothing is returned.
+    """
+    # spawn, so workers never inherit the parent's open SQLite connections
+    context = multiprocessing.get_context("spawn")
+    started = context.Queue()
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(to_extract)), mp_context=context,
+                               initializer=_init_worker, initargs=(started,))
+    futures = {pool.submit(_extract_worker, item[0], timeout): item for item in to_extract}
+    running = set(futures)
+    not_started = []
+    unsure = []
+    try:
+        while running:
+            done, running = wait(running, timeout=(timeout * 2 + 30) if timeout else None, return_when=FIRST_COMPLETED)
+            if not done:
+                started_paths = set()
+                while not started.empty():
+                    started_paths.add(started.get())
+                for future in running:
+                    file_path, stat, digest = futures[future]
+                    if future.cancel():
+                        not_started.append(futures[future])
+                    elif file_path not in started_paths and len(futures) > 1:
+                        # In a worker's call queue, or started with the message still unsent
+                        unsure.append(futures[future])
+                    else:
+                        finish_file(file_path, stat, digest, None, f"timed out after {timeout}s")
+                _terminate_workers(pool)
+                break
+            for future in done:
+                file_path, stat, digest = futures[future]
+                try:
+                    text, error = future.result()
+                except Exception as e:
+                    text, error = None, str(e)
+                if text is not None:
+                    text_cache.set(text_key(file_path, stat), file_path, text)
+                finish_file(file_path, stat, digest, text, error)
+    finally:
+        pool.shutdown(wait=not running, cancel_futures=True)
+    return not_started, unsure
+
+def ingest(directory=None, workers=None, timeout=None, on_progress=None):
+    """
+    Bring the document index up to date, extracting new and changed files on a process pool.
+    Texts already in the text cache are indexed directly, extracted texts are cached and
+    indexed as each worker finishes. on_progress(report) is called after every file.
+    Returns the report: counts, input bytes, elapsed seconds, files/s and MB/s.
+    """
+    from services.search.documents import DOCUMENTS_DIR, DOCUMENT_EXTENSIONS, document_index
+
+    directory = directory or DOCUMENTS_DIR
+    workers = workers or INGEST_WORKERS or os.cpu_count() or 1
+    timeout = INGEST_FILE_TIMEOUT if timeout is None else timeout
+    started = time.perf_counter()
+    report = {"directory": directory, "workers": workers, "pending": 0, "indexed": 0, "cached": 0,
+              "failed": 0, "timed_out": 0, "bytes": 0, "seconds": 0.0, "files_per_s": 0.0, "mb_per_s": 0.0}
+
+    def finish_file(file_path, stat, digest, text, error=None):
+        if error:
+            logging.error(f"Could not ingest {file_path}: {error}")
+            report["timed_out" if error.startswith("timed out") else "failed"] += 1
+        elif text is not None:
+            document_index.add(file_path, stat.st_mtime, stat.st_size, digest, text)
+            report["indexed"] += 1
+        report["bytes"] += stat.st_size
+        elapsed = time.perf_counter() - started
+        report["seconds"] = round(elapsed, 2)
+        done = report["indexed"] + report["failed"] + report["timed_out"]
+        report["files_per_s"] = round(done / elapsed, 2) if elapsed else 0.0
+        report["mb_per_s"] = round(report["bytes"] / 1e6 / elapsed, 2) if elapsed else 0.0
+        if on_progress:
+            on_progress(dict(report))
+
+    to_extract = []
+    pending = document_index.pending(directory, DOCUMENT_EXTENSIONS)
+    report["pending"] = len(pending)
+    for file_path, stat, digest in pending:
+        text = text_cache.get(text_key(file_path, stat))
+        if text is None:
+            to_extract.append((file_path, stat, digest))
+        else:
+            report["cached"] += 1
+            finish_file(file_path, stat, digest, text)
+
+    # Every stalled round leaves at least one file behind as timed out or unsure, so this ends
+    while to_extract:
+        to_extract, unsure = _extract_round(to_extract, workers, timeout, finish_file)
+        for item in unsure:
+            # Alone on a pool a stall can only be this file's own, it is not retried again
+            _extract_round([item], 1, timeout, finish_file)
+
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
+
+def start_ingest(directory=None, workers=None, timeout=None):
+    """Run ingest on a background thread, False if one is already running. Progress is in ingest_status()."""
+    global _last_report
+    with _report_lock:
+        if _last_report.get("running"):
+            return False
+        _last_report = {"running": True}
+
+    def progress(report):
+        global _last_report
+        with _report_lock:
+            _last_report = {**report, "running": True}
+
+    def run():
+        global _last_report
+        try:
+            report = ingest(directory, workers, timeout, on_progress=progress)
+        except Exception as e:
+            logging.error(f"Document ingestion failed: {e}")
+            report = {"error": str(e)}
+        with _report_lock:
+            _last_report = {**report, "running": False}
+
+    threading.Thread(target=run, name="ingest", daemon=True).start()
+    return True
+
+def ingest_status():
+    with _report_lock:
+        return dict(_last_report)
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and index documents on a process pool.")
+    parser.add_argument('directory', nargs='?', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=None, help="Seconds allowed per file")
+    args = parser.parse_args()
+
+    def progress(report):
+        done = report["indexed"] + report["failed"] + report["timed_out"]
+        print(f"\r{done}/{report['pending']} files  {report['files_per_s']} files/s  {report['mb_per_s']} MB/s", end="", flush=True)
+
+    report = ingest(args.directory, args.workers, args.timeout, on_progress=progress)
+    print()
+    print(report)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# /app/services/search/page_cache.py
+
+print("/app/services/search/page_cache.py has been imported successfully!")
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from settings import get_setting
+
+CACHE_DIR = get_setting("CACHE_DIR")
+PAGE_CACHE_MAX_BYTES = get_setting("PAGE_CACHE_MAX_BYTES")
+PAGE_CACHE_MAX_AGE = get_setting("PAGE_CACHE_MAX_AGE")
+
+
+class PageCache:
+    """
+    On-disk cache of scraped pages used for conditional GETs.
+    Each entry keeps the compressed body, its ETag/Last-Modified validators and the
+    candidate texts extracted from it, so a 304 response needs neither a download nor a parse.
+    Pages whose extraction stopped at an early hit are stored as incomplete, their candidates
+    only cover the part of the page that was read.
+    Entries older than max_age are dropped and the total size is kept under max_bytes.
+    """
+    def __init__(self, db_path, max_bytes, max_age):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._counters = {"lookups": 0, "revalidated": 0, "refreshed": 0, "stored": 0, "evictions": 0}
+        self._db = None
+        self._total_bytes = 0
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, candidates TEXT, "
+                "complete INTEGER NOT NULL DEFAULT 1, "
+                "size INTEGER NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(pages)")]
+            if 'complete' not in columns:
+                self._db.execute("ALTER TABLE pages ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+            self._db.commit()
+            self._evict()
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Page cache could not open {db_path}, conditional requests are disabled: {e}")
+            self._db = None
+
+    @property
+    def enabled(self):
+        return self._db is not None and self.max_bytes > 0 and self.max_age > 0
+
+    def get(self, url):
+        """Return the cached validators and candidates for url, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._counters["lookups"] += 1
+            row = self._db.execute(
+                "SELECT etag, last_modified, candidates, complete, stored_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or row[4] < time.time() - self.max_age:
+            return None
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "candidates": json.loads(row[2]) if row[2] else None,
+            "complete": bool(row[3]),
+        }
+
+    def conditional_headers(self, cached):
+        headers = {}
+        if cached and cached["etag"]:
+            headers['If-None-Match'] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers['If-Modified-Since'] = cached["last_modified"]
+        return headers
+
+    def body(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT body FROM pages WHERE url = ?", (url,)).fetchone()
+        return zlib.decompress(row[0]) if row and row[0] else None
+
+    def revalidated(self, url, candidates=None):
+        """Mark a 304 response, optionally filling in candidates that were re-extracted from the stored body."""
+        with self._lock:
+            self._counters["revalidated"] += 1
+            now = time.time()
+            if candidates is not None:
+                self._db.execute(
+                    "UPDATE pages SET candidates = ?, stored_at = ?, accessed_at = ? WHERE url = ?",
+                    (json.dumps(candidates), now, now, url),
+                )
+            else:
+                self._db.execute("UPDATE pages SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+
+    def store(self, url, etag, last_modified, body, candidates, complete=True, refreshed=False):
+        if not self.enabled or not (etag or last_modified):
+            return
+        compressed = zlib.compress(body)
+        payload = json.dumps(candidates) if candidates is not None else None
+        size = len(compressed) + len(payload or "")
+        now = time.time()
+        with self._lock:
+            self._counters["refreshed" if refreshed else "stored"] += 1
+            old = self._db.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, body, candidates, complete, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, compressed, payload, int(complete), size, now, now),
+            )
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Drop entries past max_age, then the least recently used ones until under max_bytes."""
+        self._db.execute("DELETE FROM pages WHERE stored_at < ?", (time.time() - self.max_age,))
+        rows = self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall()
+        self._total_bytes = sum(size for _, size in rows)
+        for url, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self._total_bytes -= size
+            self._counters["evictions"] += 1
+        self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["bytes"] = self._total_bytes
+        return counters
+
+page_cache = PageCache(os.path.join(CACHE_DIR, "pages.sqlite"), PAGE_CACHE_MAX_BYTES, PAGE_CACHE_MAX_AGE)
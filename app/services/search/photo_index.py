@@ -0,0 +1,133 @@
+# /app/services/search/photo_index.py
+
+print("/app/services/search/photo_index.py has been imported successfully!")
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from services.search.exif import read_dates
+
+SCHEMA_VERSION = 1
+
+
+class PhotoIndex:
+    """
+    On-disk index of the date taken of every photo, as path, mtime, size and the EXIF
+    DateTimeOriginal date ("YYYY:MM:DD", NULL when the photo has none).
+    Photos are read again only when their mtime or size changed, and date queries are
+    range lookups on the taken index, so no image is opened at query time.
+    """
+    def __init__(self, db_path, extensions):
+        self.extensions = extensions
+        self._lock = threading.RLock()
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Photo index could not open {db_path}, indexing in memory: {e}")
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS photos")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS photos ("
+            "path TEXT PRIMARY KEY, mtime REAL NOT NULL, size INTEGER NOT NULL, taken TEXT, indexed_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS photos_taken ON photos (taken);"
+            f"PRAGMA user_version = {SCHEMA_VERSION};"
+        )
+        self._db.commit()
+
+    def _set(self, rows):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO photos (path, mtime, size, taken, indexed_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._db.commit()
+
+    def update(self, path, read_date):
+        """Re-read the date of a single photo, or of every photo under a directory, if it changed."""
+        if os.path.isdir(path):
+            return self.refresh(path, read_date, remove_missing=False)
+        if not path.lower().endswith(self.extensions):
+            return 0
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.remove(path)
+            return 0
+        with self._lock:
+            previous = self._db.execute("SELECT mtime, size FROM photos WHERE path = ?", (path,)).fetchone()
+        if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+            return 0
+        self._set([(path, stat.st_mtime, stat.st_size, read_date(path), time.time())])
+        return 1
+
+    def remove(self, path):
+        """Drop a photo, or every photo under a directory, from the index."""
+        prefix = os.path.join(path, '')
+        with self._lock:
+            self._db.execute("DELETE FROM photos WHERE path = ? OR substr(path, 1, length(?)) = ?", (path, prefix, prefix))
+            self._db.commit()
+
+    def refresh(self, directory, read_date, remove_missing=True, batch_size=500):
+        """
+        Bring the index up to date with the photos under directory, reading only new and
+        changed files, batch_size at a time on the read_dates thread pool.
+        Returns the number of photos that were (re)read.
+        """
+        prefix = os.path.join(directory, '')
+        with self._lock:
+            known = {
+                row[0]: row[1:] for row in
+                self._db.execute("SELECT path, mtime, size FROM photos WHERE substr(path, 1, length(?)) = ?", (prefix, prefix))
+            }
+        read = 0
+        changed = []
+
+        def read_batch():
+            dates = read_dates([path for path, _ in changed], read_date)
+            self._set([(path, stat.st_mtime, stat.st_size, date, time.time()) for (path, stat), date in zip(changed, dates)])
+            changed.clear()
+
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                if not file_name.lower().endswith(self.extensions):
+                    continue
+                file_path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError as e:
+                    logging.error(f"Could not index {file_path}: {e}")
+                    continue
+                previous = known.pop(file_path, None)
+                if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                    continue
+                changed.append((file_path, stat))
+                read += 1
+                if len(changed) >= batch_size:
+                    read_batch()
+        if changed:
+            read_batch()
+
+        if remove_missing and known:
+            with self._lock:
+                self._db.executemany("DELETE FROM photos WHERE path = ?", ((path,) for path in known))
+                self._db.commit()
+        return read
+
+    def between(self, directory, start, end):
+        """(path, taken) of the photos under directory taken from start to end, both "YYYY:MM:DD" and inclusive."""
+        prefix = os.path.join(directory, '')
+        with self._lock:
+            return self._db.execute(
+                "SELECT path, taken FROM photos WHERE taken BETWEEN ? AND ? AND substr(path, 1, length(?)) = ? "
+                "ORDER BY taken, path",
+                (start, end, prefix, prefix),
+            ).fetchall()
+
+    def stats(self):
+        with self._lock:
+            photos, dated = self._db.execute("SELECT COUNT(*), COUNT(taken) FROM photos").fetchone()
+        return {"photos": photos, "dated": dated}
@@ -8,9 +8,16 @@ import os
 import pytz
 from PIL import Image
 from PIL.ExifTags import TAGS
+from settings import get_setting
+from services.search.photo_index import PhotoIndex
+from services.search.exif import read_date_taken
+from services.watcher import is_watched
+
+CACHE_DIR = get_setting("CACHE_DIR")
 
 photo_dir = '/app/app/Media/Photos'
 selected_photos = []
+PHOTO_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
 
 def extract_year_from_query(query):
     """Extract the year from the given query string."""
@@ -28,6 +35,19 @@ def extract_year_from_input(input_string):
         sys.exit(1)
 
 def get_date_taken(path):
+    """
+    The date part of the DateTimeOriginal of an image. JPEG headers are parsed directly,
+    other formats and headers the fast reader can't make sense of go through PIL.
+    """
+    if path.lower().endswith(('.jpg', '.jpeg')):
+        try:
+            return read_date_taken(path)
+        except Exception:
+            # Any header the fast reader trips over is PIL's to read, one bad file must not end a scan
+            pass
+    return pil_date_taken(path)
+
+def pil_date_taken(path):
     """Extract the DateTimeOriginal from the EXIF data of an image."""
     try:
         image = Image.open(path)
@@ -41,55 +61,45 @@ def get_date_taken(path):
         print(f"Error reading EXIF data from {path}: {e}")
     return None
 
-def find_photos_by_year(photo_dir, year):
-    photos = []
-    debug_info = []  # To store debug information
+photo_index = PhotoIndex(os.path.join(CACHE_DIR, "photos.sqlite"), PHOTO_EXTENSIONS)
 
-    for root, _, files in os.walk(photo_dir):
-        debug_info.append(f"Searching in directory: {root}")
-        for file in files:
-            file_path = os.path.join(root, file)
-            debug_info.append(f"Checking file: {file_path}")
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                date_taken = get_date_taken(file_path)
-                if date_taken:
-                    photo_year = date_taken.split(":")[0]
-                    debug_info.append(f"Date Taken: {date_taken}")
-                    if photo_year == str(year):
-                        photos.append(os.path.relpath(file_path, photo_dir))
-                        debug_info.append(f"Found matching photo: {file_path}")
+def photos_taken_between(photo_dir, start, end, debug_info):
+    """Paths relative to photo_dir of the photos taken from start to end ("YYYY:MM:DD", inclusive)."""
+    # A watched directory is kept current by the watcher, otherwise only new and changed photos are read
+    if not is_watched(photo_dir):
+        read = photo_index.refresh(photo_dir, get_date_taken)
+        debug_info.append(f"Read the date of {read} new or changed photos in: {photo_dir}")
+    photos = []
+    for file_path, date_taken in photo_index.between(photo_dir, start, end):
+        photos.append(os.path.relpath(file_path, photo_dir))
+        debug_info.append(f"Found matching photo: {file_path} (taken {date_taken})")
+    return photos
 
+def find_photos_by_year(photo_dir, year):
+    debug_info = []  # To store debug information
+    debug_info.append(f"Searching for photos from the year: {year}")
+    photos = photos_taken_between(photo_dir, f"{year}:01:01", f"{year}:12:31", debug_info)
     return photos, debug_info
 
-
-
-
-def find_photos_one_year_ago(photo_dir):
-    photos = []
+def find_photos_between(photo_dir, start, end):
+    """Photos taken from start to end, both dates inclusive."""
     debug_info = []
+    debug_info.append(f"Searching for photos from the date range: {start:%Y:%m:%d} to {end:%Y:%m:%d}")
+    photos = photos_taken_between(photo_dir, start.strftime("%Y:%m:%d"), end.strftime("%Y:%m:%d"), debug_info)
+    return photos, debug_info
 
-    sweden_tz = pytz.timezone('Europe/Stockholm')
-
-    today_sweden = datetime.now(sweden_tz)
-
-    one_year_ago_start = (today_sweden - timedelta(days=1)).replace(year=today_sweden.year - 1).strftime("%Y:%m:%d")
-    one_year_ago_end = (today_sweden + timedelta(days=1)).replace(year=today_sweden.year - 1).strftime("%Y:%m:%d")
+def years_before(day, years):
+    """The same day `years` years earlier, 28 February for 29 February in a non-leap year."""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
 
-    debug_info.append(f"Searching for photos from the date range: {one_year_ago_start} to {one_year_ago_end}")
+def find_photos_one_year_ago(photo_dir, years=1):
+    """Photos taken this day, give or take a day, `years` years ago."""
+    sweden_tz = pytz.timezone('Europe/Stockholm')
 
-    for root, _, files in os.walk(photo_dir):
-        debug_info.append(f"Searching in directory: {root}")
-        for file in files:
-            file_path = os.path.join(root, file)
-            debug_info.append(f"Checking file: {file_path}")
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                date_taken = get_date_taken(file_path)
-                if date_taken:
-                    date_taken_str = date_taken.split(" ")[0]  
-                    debug_info.append(f"Date Taken: {date_taken_str}")
-                    
-                    if one_year_ago_start <= date_taken_str <= one_year_ago_end:
-                        photos.append(os.path.relpath(file_path, photo_dir))
-                        debug_info.append(f"Found matching photo: {file_path}")
+    today_sweden = datetime.now(sweden_tz).date()
 
-    return photos, debug_info
+    return find_photos_between(photo_dir, years_before(today_sweden - timedelta(days=1), years),
+                               years_before(today_sweden + timedelta(days=1), years))
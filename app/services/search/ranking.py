@@ -0,0 +1,100 @@
+# /app/services/search/ranking.py
+
+print("/app/services/search/ranking.py has been imported successfully!")
+
+import re
+import math
+import heapq
+from collections import Counter
+from settings import get_setting
+from services.search.scoring import compile_matcher, IMPORTANT_PHRASES
+
+BM25_TOP_K = get_setting("BM25_TOP_K")
+PASSAGE_WORDS = get_setting("PASSAGE_WORDS")
+BM25_K1 = 1.2
+BM25_B = 0.75
+PHRASE_BOOST = 0.5
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def split_passages(text, max_words=None):
+    """Split text at sentence and line breaks and pack the pieces into passages of at most max_words words."""
+    max_words = max_words or PASSAGE_WORDS
+    passages = []
+    current = []
+    for sentence in SENTENCE_PATTERN.split(text):
+        words = sentence.split()
+        if not words:
+            continue
+        if current and len(current) + len(words) > max_words:
+            passages.append(" ".join(current))
+            current = []
+        while len(words) > max_words:
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+class PassageRanker:
+    """
+    BM25 over passages with document frequencies taken from the search results of the request.
+    Important words count double and passages containing a multi-word important phrase of
+    the query get a boost. Build one per request and reuse it for snippets and pages.
+    """
+    def __init__(self, user_input, corpus=()):
+        self.matcher = compile_matcher(user_input)
+        important_words = {phrase for phrase in IMPORTANT_PHRASES if " " not in phrase}
+        query = " ".join(user_input.lower().split())
+
+        self.term_weights = {token: 2.0 if token in important_words else 1.0 for token in tokenize(query)}
+        self.phrases = [phrase for phrase in IMPORTANT_PHRASES if " " in phrase and phrase in query]
+        self._document_frequency = dict.fromkeys(self.term_weights, 0)
+        self._documents = 0
+        self._total_length = 0
+        for text in corpus:
+            for passage in split_passages(text):
+                self._observe(tokenize(passage))
+
+    def _observe(self, tokens):
+        self._documents += 1
+        self._total_length += len(tokens)
+        for term in self.term_weights.keys() & set(tokens):
+            self._document_frequency[term] += 1
+
+    def idf(self, term):
+        document_frequency = self._document_frequency.get(term, 0)
+        return math.log(1 + (self._documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def score(self, passage):
+        tokens = tokenize(passage)
+        if not tokens:
+            return 0.0
+        average_length = self._total_length / self._documents if self._documents else len(tokens)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / average_length)
+
+        counts = Counter(token for token in tokens if token in self.term_weights)
+        score = sum(
+            self.term_weights[term] * self.idf(term) * count * (BM25_K1 + 1) / (count + norm)
+            for term, count in counts.items()
+        )
+        if score and self.phrases:
+            lowered = passage.lower()
+            score *= 1 + PHRASE_BOOST * sum(1 for phrase in self.phrases if phrase in lowered)
+        return score
+
+    def rank(self, texts, k=None):
+        """Split the texts into passages and return the k best as (score, passage), best first."""
+        scored = []
+        for text in texts:
+            for passage in split_passages(text):
+                score = self.score(passage)
+                if score > 0:
+                    scored.append((score, passage))
+        return heapq.nlargest(k or BM25_TOP_K, scored, key=lambda item: item[0])
@@ -0,0 +1,62 @@
+# /app/services/search/scoring.py
+
+print("/app/services/search/scoring.py has been imported successfully!")
+
+import ast
+from functools import lru_cache
+from settings import get_setting
+
+
+def parse_phrases(value):
+    """important_phrases is stored as the text of a Python list, plain comma separated text works too."""
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            value = value.split(',')
+    if isinstance(value, str):
+        value = [value]
+    return [" ".join(str(phrase).lower().split()) for phrase in value if str(phrase).strip()]
+
+IMPORTANT_PHRASES = parse_phrases(get_setting("important_phrases"))
+
+
+class PhraseMatcher:
+    """
+    A query compiled once and reused for every snippet, meta tag and page of a request.
+    Each query word scores 1, or 2 if it is an important phrase. Multi-word important
+    phrases that occur in the query score 2 more when the whole phrase is found.
+    Scoring lowercases the text once and runs one C substring search per distinct term,
+    which measured faster in CPython than a regex alternation or an Aho-Corasick automaton
+    walked from Python.
+    """
+    def __init__(self, user_input, important_phrases=None):
+        phrases = IMPORTANT_PHRASES if important_phrases is None else important_phrases
+        query = " ".join(user_input.lower().split())
+        important_words = {phrase for phrase in phrases if " " not in phrase}
+
+        weights = {}
+        for word in query.split():
+            weights[word] = weights.get(word, 0) + (2 if word in important_words else 1)
+        for phrase in phrases:
+            if " " in phrase and phrase in query:
+                weights[phrase] = weights.get(phrase, 0) + 2
+
+        # Short terms first, they are the most likely to hit when only a yes/no is needed
+        self.terms = sorted(weights.items(), key=lambda item: len(item[0]))
+
+    def score(self, text):
+        text = text.lower()
+        return sum(weight for term, weight in self.terms if term in text)
+
+    def matches(self, text):
+        """True if any query term occurs in text, same as score(text) > 0 but stops at the first hit."""
+        text = text.lower()
+        return any(term in text for term, _ in self.terms)
+
+@lru_cache(maxsize=256)
+def compile_matcher(user_input):
+    return PhraseMatcher(user_input)
+
+def improved_string_matching(description, user_input):
+    return compile_matcher(user_input).score(description)
@@ -3,115 +3,288 @@
 print("/app/services/search/search.py has been imported successfully!")
 
 import requests
-from bs4 import BeautifulSoup
 from settings import get_setting
 from duckduckgo_search import DDGS
 import logging
+import time
+import hashlib
+import threading
 import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from services.search.fetch import fetch_first_hit, url_host
+from services.connect.http_client import http_get
+from services.cache import TieredCache, normalize_query, single_flight
+from services.search.page_cache import page_cache
+from services.search.domain_stats import domain_stats
+from services.search.extract import is_html_response, extract_from_response, extract_from_bytes
+from services.search.ranking import PassageRanker
+from services.deadline import Deadline
 
 REGION = get_setting("REGION")
 MIN_SCORE_THRESHOLD = get_setting("MIN_SCORE_THRESHOLD")
-IMPORTANT_PHRASES = get_setting("important_phrases")
+PASSAGE_MIN_SCORE = get_setting("PASSAGE_MIN_SCORE")
 SEARCH_DEPTH = get_setting("SEARCH_DEPTH")
 FALLBACK_TO_AI_CHAT = get_setting("FALLBACK_TO_AI_CHAT")
 LOOP_UNTIL_SUCCESS = get_setting("LOOP_UNTIL_SUCCESS")
+SEARCH_CACHE_TTL = get_setting("SEARCH_CACHE_TTL")
+SEARCH_CACHE_MAX_ENTRIES = get_setting("SEARCH_CACHE_MAX_ENTRIES")
+SEARCH_CACHE_MAX_BYTES = get_setting("SEARCH_CACHE_MAX_BYTES")
+AI_CACHE_TTL = get_setting("AI_CACHE_TTL")
+AI_CACHE_MAX_ENTRIES = get_setting("AI_CACHE_MAX_ENTRIES")
+AI_CACHE_MAX_BYTES = get_setting("AI_CACHE_MAX_BYTES")
+SPECULATIVE_AI_CHAT = get_setting("SPECULATIVE_AI_CHAT")
+SPECULATIVE_AI_DELAY = get_setting("SPECULATIVE_AI_DELAY")
+AI_CHAT_ERROR = "I couldn't find the information directly, and the AI Chat also encountered an issue."
 
 ddgs = DDGS()
+search_cache = TieredCache("search_results", SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_BYTES)
+ai_cache = TieredCache("ai_answers", AI_CACHE_TTL, AI_CACHE_MAX_ENTRIES, AI_CACHE_MAX_BYTES)
+speculation_pool = ThreadPoolExecutor(thread_name_prefix="speculate")
 
 
-def improved_string_matching(description, user_input):
-    description = description.lower()
-    user_input_words = user_input.lower().split()
-    
-    score = sum(2 if word in IMPORTANT_PHRASES else 1 for word in user_input_words if word in description)
-    return score
+def cached_text_search(query, deadline=None):
+    """DuckDuckGo text search, repeated questions in the same region are served from the cache."""
+    key = f"{REGION}:{normalize_query(query)}"
+    if SEARCH_CACHE_TTL > 0:
+        results = search_cache.get(key)
+        if results is not None:
+            return results
 
-def parse_description_for_answer(results, user_input):
-    best_score = 0
-    best_answer = None
-    
-    for result in results:
-        description = result['body']
-        score = improved_string_matching(description, user_input)
-        if score > best_score:
-            best_score = score
-            best_answer = description
-            
-        if best_score >= MIN_SCORE_THRESHOLD:
-            return best_answer
-        
+    if deadline is not None and deadline.check("search"):
+        return []
+    timeout = deadline.timeout(10) if deadline is not None else 10
+    results = DDGS(timeout=max(1, int(timeout))).text(query, region=REGION)
+    if results and SEARCH_CACHE_TTL > 0:
+        search_cache.set(key, results)
+    return results
+
+
+def result_ranker(results, user_input):
+    """A PassageRanker whose document frequencies come from the snippets of this result set."""
+    return PassageRanker(user_input, [result['body'] for result in results])
+
+def best_snippet(results, ranker):
+    """Highest ranked snippet with any score, the answer of last resort when time runs out."""
+    scored = [(ranker.score(result['body']), result['body']) for result in results]
+    scored = [item for item in scored if item[0] > 0]
+    return max(scored, key=lambda item: item[0])[1] if scored else None
+
+def parse_description_for_answer(results, user_input, ranker=None):
+    """The best BM25 ranked snippet that reaches MIN_SCORE_THRESHOLD."""
+    ranker = ranker or result_ranker(results, user_input)
+    ranked = sorted(results, key=lambda result: ranker.score(result['body']), reverse=True)
+    for result in ranked:
+        if ranker.matcher.score(result['body']) >= MIN_SCORE_THRESHOLD:
+            return result['body']
     return None
 
-def inspect_page_source(url, user_input):
+def match_page_candidates(candidates, user_input, ranker=None):
+    """The top ranked passages of a page joined as a data block, None if none of them reaches PASSAGE_MIN_SCORE."""
+    ranker = ranker or PassageRanker(user_input)
+    top_passages = ranker.rank(candidates)
+    if not any(ranker.matcher.score(passage) >= PASSAGE_MIN_SCORE for _, passage in top_passages):
+        return None
+    return "\n...\n".join(passage for _, passage in top_passages)
+
+def _stopped(deadline=None, stop_event=None):
+    return (deadline is not None and deadline.expired()) or (stop_event is not None and stop_event.is_set())
+
+def _extract_page(url, page, ranker, refreshed, deadline=None, stop_event=None):
+    page.raise_for_status()
+    if not is_html_response(page):
+        return []
+
+    extraction = extract_from_response(page, lambda text: ranker.matcher.score(text) >= PASSAGE_MIN_SCORE,
+                                       deadline=deadline, stop_event=stop_event)
+    if _stopped(deadline, stop_event) and not extraction.complete:
+        # Cut off by the deadline or a stop, a later 304 must not serve this partial body as the page
+        return extraction.candidates
+    page_cache.store(url, page.headers.get('ETag'), page.headers.get('Last-Modified'), extraction.body,
+                     extraction.candidates, complete=extraction.complete, refreshed=refreshed)
+    return extraction.candidates
+
+def read_page_candidates(url, ranker, headers, deadline=None, stop_event=None):
+    """
+    Candidate texts of a page, a cached copy is revalidated instead of downloaded when the server allows it.
+    The body stops being read once stop_event is set, the candidates are then those of the part read.
+    """
+    cached = page_cache.get(url)
+    with http_get(url, headers={**headers, **page_cache.conditional_headers(cached)}, deadline=deadline, stream=True) as page:
+        if page.status_code != 304 or not cached:
+            return _extract_page(url, page, ranker, cached is not None, deadline, stop_event)
+
+        # Unchanged since last visit, score the stored candidates without downloading or parsing
+        candidates = cached["candidates"]
+        if candidates is None:
+            candidates = extract_from_bytes(page_cache.body(url) or b"").candidates
+            page_cache.revalidated(url, candidates)
+        else:
+            page_cache.revalidated(url)
+        if cached["complete"] or any(ranker.matcher.score(candidate) >= PASSAGE_MIN_SCORE for candidate in candidates):
+            return candidates
+
+    if _stopped(stop_event=stop_event):
+        return candidates
+    # The stored copy stopped at an earlier hit and doesn't answer this question, read the whole page
+    with http_get(url, headers=headers, deadline=deadline, stream=True) as page:
+        return _extract_page(url, page, ranker, True, deadline, stop_event)
+
+def inspect_page_source(url, user_input, stop_event=None, ranker=None, deadline=None):
+    ranker = ranker or PassageRanker(user_input)
     try:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
         
+        # A read cut short by the deadline or a stop says nothing about the domain
+        def countable():
+            return not _stopped(deadline, stop_event)
+
+        failed_after = None
         for attempt in range(3):  # Try up to 3 times with different headers
+            if stop_event is not None and stop_event.is_set():
+                return None
+            if deadline is not None and deadline.check("page_fetch"):
+                return None
+            if not domain_stats.allow(url):
+                return None
+            started = time.monotonic()
             try:
-                page = requests.get(url, headers=headers, timeout=10)
-                page.raise_for_status()
-                soup = BeautifulSoup(page.content, 'html.parser')
-                
-                json_ld = soup.find('script', type='application/ld+json')
-                if json_ld:
-                    structured_data = json_ld.get_text()
-                    if improved_string_matching(structured_data, user_input):
-                        return structured_data[:500]
-
-                for tag in ['meta', 'div', 'span']:
-                    elements = soup.find_all(tag)
-                    for element in elements:
-                        if element.get('content'):
-                            content = element.get('content').lower()
-                            if improved_string_matching(content, user_input):
-                                return content[:500]
-
-                text = soup.get_text().lower()
-                if improved_string_matching(text, user_input):
-                    return text[:500]
-                
-                break  # If no errors, break out of retry loop
+                candidates = read_page_candidates(url, ranker, headers, deadline, stop_event)
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                answer = match_page_candidates(candidates, user_input, ranker)
+                if countable():
+                    domain_stats.record(url, time.monotonic() - started, hit=answer is not None)
+                return answer
 
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status is not None and status < 500 and status != 429:
+                    # The domain answered, only this page is missing or refused, retrying won't help
+                    if countable():
+                        domain_stats.record(url, time.monotonic() - started)
+                    return None
+                failed_after = time.monotonic() - started
+                continue
             except requests.RequestException:
+                failed_after = time.monotonic() - started
                 continue
+
+        # However many attempts it took, one failed page counts once against its domain
+        if failed_after is not None and countable():
+            domain_stats.record(url, failed_after, error=True)
         
     except Exception as e:
         logging.error(f"Unhandled exception: {e}")
     return None
 
-def fallback_to_ai_chat(user_input, data_block=None):
+def inspect_results_concurrently(results, user_input, ranker=None, deadline=None, cancel=None, progress=None):
+    """Inspect the result pages in parallel, returns the answer of the best ranked page that has one."""
+    ranker = ranker or result_ranker(results, user_input)
+    urls = domain_stats.order([result['href'] for result in results[:SEARCH_DEPTH]])
+
+    def inspect(url, stop_event):
+        if progress is not None:
+            progress.emit("status", f"Checking {url_host(url)}")
+        return inspect_page_source(url, user_input, stop_event, ranker, deadline)
+
+    hit = fetch_first_hit(
+        urls,
+        inspect,
+        deadline=deadline,
+        cancel=cancel,
+    )
+    if hit:
+        return hit[1]
+    return None
+
+def ai_answer_key(user_input, data_block=None):
+    """Same question with a byte-identical data block gives the same key."""
+    digest = hashlib.sha256((data_block or "").encode('utf-8')).hexdigest()
+    return f"{normalize_query(user_input)}:{digest}"
+
+def fallback_to_ai_chat(user_input, data_block=None, deadline=None):
+    key = ai_answer_key(user_input, data_block)
+    if AI_CACHE_TTL > 0:
+        cached_answer = ai_cache.get(key)
+        if cached_answer is not None:
+            return cached_answer
+
+    if deadline is not None and deadline.check("ai_chat"):
+        return None
     try:
         ddg = DDGS()
         if data_block:
             combined_input = f"{user_input}\n\nData Block:\n{data_block}"
         else:
             combined_input = user_input
-        response = ddg.chat(combined_input, model="gpt-4o-mini")
-        return response
+        timeout = deadline.timeout(30) if deadline is not None else 30
+        response = ddg.chat(combined_input, model="gpt-4o-mini", timeout=max(1, int(timeout)))
     except Exception:
-        return "I couldn't find the information directly, and the AI Chat also encountered an issue."
+        return AI_CHAT_ERROR
+
+    if response and AI_CACHE_TTL > 0:
+        ai_cache.set(key, response)
+    return response
+
+class SpeculativeAIChat:
+    """
+    A plain AI chat started SPECULATIVE_AI_DELAY seconds into the page scan, so a miss there
+    doesn't pay for the scan and the AI chat in sequence. confident is a Future that resolves
+    with the answer once the AI chat has a usable one, pass it as cancel to stop the scan.
+    A chat that is already in flight when cancelled finishes in the background, its answer is
+    only kept in the AI cache.
+    """
+    def __init__(self, user_input, deadline=None, delay=None, progress=None):
+        self.confident = Future()
+        self._go = threading.Event()
+        self._cancelled = threading.Event()
+        delay = SPECULATIVE_AI_DELAY if delay is None else delay
+        self.future = speculation_pool.submit(self._run, user_input, deadline, delay, progress)
+
+    def _run(self, user_input, deadline, delay, progress):
+        self._go.wait(delay)
+        if self._cancelled.is_set():
+            return None
+        if progress is not None:
+            progress.emit("status", "Asking the AI chat")
+        answer = fallback_to_ai_chat(user_input, deadline=deadline)
+        if answer and answer != AI_CHAT_ERROR:
+            self.confident.set_result(answer)
+        return answer
+
+    def result(self, deadline=None):
+        """Skip what is left of the delay and wait for the answer, None if cancelled or out of time."""
+        self._go.set()
+        try:
+            return self.future.result(timeout=deadline.remaining() if deadline else None)
+        except TimeoutError:
+            deadline.exhaust("ai_chat")
+            return None
+
+    def cancel(self):
+        self._cancelled.set()
+        self._go.set()
+        self.future.cancel()
 
 def ai_chat(user_input):
     query = user_input
-    ddgs = DDGS()
-    results = ddgs.text(query)
+    results = cached_text_search(query)
     
     if not results:
         return "No search results were found."
     
+    ranker = result_ranker(results, user_input)
     attempt_count = 0
     
     while attempt_count < SEARCH_DEPTH or LOOP_UNTIL_SUCCESS:
-        description_answer = parse_description_for_answer(results, user_input)
+        description_answer = parse_description_for_answer(results, user_input, ranker)
         if description_answer:
             return description_answer
 
-        for index, result in enumerate(results[:SEARCH_DEPTH]):
-            url = result['href']
-            page_source_answer = inspect_page_source(url, user_input)
-            if page_source_answer:
-                return fallback_to_ai_chat(user_input, page_source_answer)
+        page_source_answer = inspect_results_concurrently(results, user_input, ranker)
+        if page_source_answer:
+            return fallback_to_ai_chat(user_input, page_source_answer)
 
         attempt_count += 1
         if not LOOP_UNTIL_SUCCESS:
@@ -123,32 +296,74 @@ def ai_chat(user_input):
         return "I searched the web but couldn't find a clear answer to your question."
 
 
-def search_web_for_answer(query):
-    ddgs = DDGS()
-    results = ddgs.text(query)
+@single_flight(
+    key=lambda query, *args, **kwargs: normalize_query(query),
+    deadline=lambda query, deadline=None, progress=None: deadline,
+    on_timeout=lambda *args, **kwargs: "I ran out of time before the web search finished.",
+)
+def search_web_for_answer(query, deadline=None, progress=None):
+    """
+    Answer a question from web search snippets, scraped pages or the AI chat, in that order.
+    Every stage respects the deadline (REQUEST_DEADLINE by default), once it is spent the best
+    answer found so far is returned and deadline.exhausted_stage tells which stage ran out.
+    With a ProgressStream the stages report status events and the scraped passages as a partial answer.
+    The same question asked while it is already being answered waits for that answer, for as
+    long as its own deadline allows and without progress events of its own.
+    """
+    deadline = deadline or Deadline()
+    if progress is not None:
+        progress.emit("status", "Searching the web")
+    results = cached_text_search(query, deadline)
 
     if not results:
+        if deadline.exhausted_stage:
+            return "I ran out of time before the web search finished."
         return "No search results were found."
 
+    ranker = result_ranker(results, query)
     attempt_count = 0
+    speculation = None
 
-    while attempt_count < SEARCH_DEPTH or LOOP_UNTIL_SUCCESS:
-        description_answer = parse_description_for_answer(results, query)
-        if description_answer:
-            return description_answer
+    try:
+        while attempt_count < SEARCH_DEPTH or LOOP_UNTIL_SUCCESS:
+            description_answer = parse_description_for_answer(results, query, ranker)
+            if description_answer:
+                return description_answer
 
-        for index, result in enumerate(results[:SEARCH_DEPTH]):
-            url = result['href']
-            page_source_answer = inspect_page_source(url, query)
+            # With SPECULATIVE_AI_CHAT the plain AI chat races the page scan, first confident answer wins
+            if speculation is None and FALLBACK_TO_AI_CHAT and SPECULATIVE_AI_CHAT:
+                speculation = SpeculativeAIChat(query, deadline, progress=progress)
+            cancel = speculation.confident if speculation else None
+
+            page_source_answer = inspect_results_concurrently(results, query, ranker, deadline, cancel, progress)
+            if cancel is not None and cancel.done():
+                return cancel.result()
             if page_source_answer:
-                
-                return fallback_to_ai_chat(query, page_source_answer)
+                if speculation:
+                    speculation.cancel()
+                if progress is not None:
+                    progress.emit("partial", page_source_answer)
+                    progress.emit("status", "Summarizing with the AI chat")
+                # Without time left for the AI chat the ranked passages are the best answer there is
+                return fallback_to_ai_chat(query, page_source_answer, deadline) or page_source_answer
 
-        attempt_count += 1
-        if not LOOP_UNTIL_SUCCESS:
-            break
+            attempt_count += 1
+            if not LOOP_UNTIL_SUCCESS or deadline.check("page_fetch"):
+                break
 
-    if FALLBACK_TO_AI_CHAT:
-        return fallback_to_ai_chat(query)
-    else:
-        return "I searched the web but couldn't find a clear answer to your question." 
+        if FALLBACK_TO_AI_CHAT:
+            if progress is not None:
+                progress.emit("status", "Asking the AI chat")
+            if speculation:
+                ai_answer = speculation.result(deadline)
+            else:
+                ai_answer = fallback_to_ai_chat(query, deadline=deadline)
+            if ai_answer:
+                return ai_answer
+    finally:
+        if speculation:
+            speculation.cancel()
+
+    if deadline.exhausted_stage:
+        return best_snippet(results, ranker) or "I ran out of time before finding a clear answer to your question."
+    return "I searched the web but couldn't find a clear answer to your question." 
@@ -0,0 +1,88 @@
+# /app/services/search/stream_search.py
+
+print("/app/services/search/stream_search.py has been imported successfully!")
+
+import re
+import mmap
+import functools
+
+MAX_CONTEXT_BYTES = 64 * 1024
+COUNT_CHUNK = 1 << 20
+
+
+@functools.lru_cache(maxsize=64)
+def compile_bytes_pattern(search_term):
+    """
+    Case-insensitive pattern for search_term over UTF-8 bytes.
+    re.IGNORECASE on bytes only folds ASCII, so every cased character becomes an
+    alternation of its encoded forms and å matches Å as well.
+    """
+    parts = []
+    for char in search_term:
+        forms = {char, char.lower(), char.upper()}
+        encoded = sorted((re.escape(form.encode('utf-8')) for form in forms), key=len, reverse=True)
+        parts.append(encoded[0] if len(encoded) == 1 else b"(?:" + b"|".join(encoded) + b")")
+    return re.compile(b"".join(parts))
+
+def _count_newlines(buffer, start, end):
+    """Newlines in buffer[start:end], counted in bounded slices so memory stays flat."""
+    count = 0
+    for position in range(start, end, COUNT_CHUNK):
+        count += buffer[position:min(end, position + COUNT_CHUNK)].count(b"\n")
+    return count
+
+def _line_start(buffer, position, lines_back, limit):
+    """Start of the line lines_back lines above the line containing position, no further back than limit bytes."""
+    floor = max(0, position - limit)
+    start = position
+    for _ in range(lines_back + 1):
+        newline = buffer.rfind(b"\n", floor, start)
+        if newline < 0:
+            return floor
+        start = newline
+    return start + 1
+
+def _line_end(buffer, position, lines_forward, limit):
+    """End of the line lines_forward lines below the line containing position, no further than limit bytes."""
+    ceiling = min(len(buffer), position + limit)
+    end = position
+    for _ in range(lines_forward + 1):
+        newline = buffer.find(b"\n", end, ceiling)
+        if newline < 0:
+            return ceiling
+        end = newline + 1
+    return end - 1
+
+def stream_search(file_path, search_term, context_lines):
+    """
+    Yield (line_no, context) for every line of a text file containing search_term, case-insensitively.
+    The file is memory-mapped and scanned with a precompiled bytes pattern, only the
+    context window around a match is decoded, so memory use does not grow with file size.
+    """
+    pattern = compile_bytes_pattern(search_term)
+    with open(file_path, 'rb') as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+        with buffer:
+            line_no = 0
+            counted_to = 0
+            position = 0
+            while True:
+                match = pattern.search(buffer, position)
+                if match is None:
+                    return
+                line_start = _line_start(buffer, match.start(), 0, MAX_CONTEXT_BYTES)
+                line_no += _count_newlines(buffer, counted_to, line_start)
+                counted_to = line_start
+
+                window_start = _line_start(buffer, match.start(), context_lines, MAX_CONTEXT_BYTES)
+                window_end = _line_end(buffer, match.end(), context_lines, MAX_CONTEXT_BYTES)
+                yield line_no, buffer[window_start:window_end].decode('utf-8', errors='replace').strip()
+
+                # One result per line, like the line scan of the indexed documents
+                line_end = buffer.find(b"\n", match.end())
+                if line_end < 0:
+                    return
+                position = line_end + 1
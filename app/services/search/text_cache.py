@@ -0,0 +1,157 @@
+# /app/services/search/text_cache.py
+# Usage (from /app/app): python -m services.search.text_cache [directory]  warms the cache
+
+print("/app/services/search/text_cache.py has been imported successfully!")
+
+import os
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from settings import get_setting
+
+CACHE_DIR = get_setting("CACHE_DIR")
+TEXT_CACHE_MAX_BYTES = get_setting("TEXT_CACHE_MAX_BYTES")
+
+
+def text_key(file_path, stat=None):
+    """Content address of a file version, the same path, mtime and size give the same key."""
+    stat = stat or os.stat(file_path)
+    return hashlib.sha1(f"{file_path}\0{stat.st_mtime_ns}\0{stat.st_size}".encode('utf-8')).hexdigest()
+
+class TextCache:
+    """
+    Compressed on-disk cache of text extracted from documents, keyed by text_key.
+    A changed file gets a new key, its old entry ages out through LRU eviction
+    once the total compressed size passes max_bytes.
+    """
+    def __init__(self, db_path, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+        self._total_bytes = 0
+        self._db = None
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS texts ("
+                "key TEXT PRIMARY KEY, path TEXT NOT NULL, body BLOB NOT NULL, "
+                "size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM texts").fetchone()[0]
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Text cache could not open {db_path}, documents are extracted on every change: {e}")
+            self._db = None
+
+    @property
+    def enabled(self):
+        return self._db is not None and self.max_bytes > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT body FROM texts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._db.execute("UPDATE texts SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def set(self, key, file_path, text):
+        if not self.enabled:
+            return
+        body = zlib.compress(text.encode('utf-8'))
+        with self._lock:
+            old = self._db.execute("SELECT size FROM texts WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO texts (key, path, body, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, file_path, body, len(body), time.time()),
+            )
+            self._total_bytes += len(body)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        rows = self._db.execute("SELECT key, size FROM texts ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM texts WHERE key = ?", (key,))
+            self._total_bytes -= size
+            self._counters["evictions"] += 1
+
+    def cached(self, extract):
+        """Wrap extract(path) so unchanged files are served from the cache."""
+        def cached_extract(file_path):
+            key = text_key(file_path)
+            text = self.get(key)
+            if text is None:
+                text = extract(file_path)
+                if text is not None:
+                    self.set(key, file_path, text)
+            return text
+        return cached_extract
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["bytes"] = self._total_bytes
+        return counters
+
+text_cache = TextCache(os.path.join(CACHE_DIR, "document_texts.sqlite"), TEXT_CACHE_MAX_BYTES)
+
+def warm(directory, extract, extensions, skip=None):
+    """
+    Extract every document under directory that isn't cached yet, except those for which
+    skip(path, stat) is true. Returns (cached, extracted, failed).
+    """
+    cached = extracted = failed = 0
+    for root, dirs, files in os.walk(directory):
+        for file_name in files:
+            file_path = os.path.join(root, file_name)
+            if not file_path.endswith(extensions):
+                continue
+            try:
+                stat = os.stat(file_path)
+                if skip and skip(file_path, stat):
+                    continue
+                key = text_key(file_path, stat)
+                if text_cache.get(key) is not None:
+                    cached += 1
+                    continue
+                text = extract(file_path)
+                if text is not None:
+                    text_cache.set(key, file_path, text)
+                    extracted += 1
+            except Exception as e:
+                logging.error(f"Could not extract {file_path}: {e}")
+                failed += 1
+    return cached, extracted, failed
+
+def main():
+    from services.search.documents import DOCUMENTS_DIR, DOCUMENT_EXTENSIONS, read_document, is_streamed
+
+    parser = argparse.ArgumentParser(description="Extract documents into the text cache ahead of the first search.")
+    parser.add_argument('directory', nargs='?', default=DOCUMENTS_DIR)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cached, extracted, failed = warm(args.directory, read_document, DOCUMENT_EXTENSIONS, skip=is_streamed)
+    print(f"{extracted} extracted, {cached} already cached, {failed} failed in {time.perf_counter() - started:.1f}s")
+    print(text_cache.stats())
+
+if __name__ == "__main__":
+    sys.exit(main())
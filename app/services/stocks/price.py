@@ -8,6 +8,7 @@ import os
 import requests_cache
 import matplotlib.pyplot as plt
 from settings import get_setting, get_dict_setting
+from services.cache import single_flight, normalize_query
 from rapidfuzz import process, fuzz
 from pytickersymbols import PyTickerSymbols
 from itertools import combinations
@@ -330,6 +331,7 @@ def find_stock_symbol_by_name(stock_name):
     return None
 
 
+@single_flight(key=normalize_query)
 def get_stock_price(query):
     """Main function to get the stock price based on a query."""
     detected_language = detect_language(query)
@@ -0,0 +1,187 @@
+# /app/services/watcher.py
+
+print("/app/services/watcher.py has been imported successfully!")
+
+import os
+import time
+import logging
+import threading
+from settings import get_setting
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+from watchdog.events import FileSystemEventHandler
+
+WATCHER_DEBOUNCE = get_setting("WATCHER_DEBOUNCE")
+WATCHER_POLL_INTERVAL = get_setting("WATCHER_POLL_INTERVAL")
+CACHE_DIR = get_setting("CACHE_DIR")
+
+_watched = {}  # directory -> DebouncedHandler
+_observer = None
+_lock = threading.Lock()
+_process_lock = None  # open lock file, held for the life of the process that watches
+
+
+class DebouncedHandler(FileSystemEventHandler):
+    """
+    Collects file events under a directory and hands them to on_changes(changed, deleted)
+    once no new event arrived for debounce seconds, so a file that is copied in several
+    writes is processed once. Moves count as a delete of the source and a change of the destination.
+    """
+    def __init__(self, directory, on_changes, debounce):
+        self.directory = directory
+        self.on_changes = on_changes
+        self.debounce = debounce
+        self.ready = threading.Event()
+        self._changed = set()
+        self._deleted = set()
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        threading.Thread(target=self._flush_loop, name=f"watch:{directory}", daemon=True).start()
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        with self._lock:
+            if event.event_type in ("deleted", "moved"):
+                self._deleted.add(event.src_path)
+                self._changed.discard(event.src_path)
+            if event.event_type == "moved":
+                self._changed.add(event.dest_path)
+                self._deleted.discard(event.dest_path)
+            elif event.event_type != "deleted" and not event.is_directory:
+                self._changed.add(event.src_path)
+                self._deleted.discard(event.src_path)
+            self._last_event = time.monotonic()
+        self._wake.set()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait()
+            # Events during the initial scan are kept and applied after it, updates are idempotent
+            self.ready.wait()
+            quiet_for = time.monotonic() - self._last_event
+            if quiet_for < self.debounce:
+                time.sleep(self.debounce - quiet_for)
+                continue
+            with self._lock:
+                changed, self._changed = self._changed, set()
+                deleted, self._deleted = self._deleted, set()
+                self._wake.clear()
+            if not (changed or deleted):
+                continue
+            try:
+                self.on_changes(changed, deleted)
+            except Exception as e:
+                logging.error(f"Applying changes under {self.directory} failed: {e}")
+
+def _start_observer():
+    """inotify (or the platform's native observer), polling when it can't be started, e.g. inotify limits."""
+    global _observer
+    if _observer is not None:
+        return _observer
+    try:
+        _observer = Observer()
+        _observer.start()
+    except OSError as e:
+        logging.error(f"Native file watching is unavailable, polling every {WATCHER_POLL_INTERVAL}s: {e}")
+        _observer = PollingObserver(timeout=WATCHER_POLL_INTERVAL)
+        _observer.start()
+    return _observer
+
+def watch(directory, on_changes, initial_scan=None, debounce=None):
+    """
+    Watch directory recursively. initial_scan() runs once on a background thread, events
+    that arrive meanwhile are folded into it, afterwards on_changes(changed, deleted) gets
+    every debounced batch.
+    """
+    directory = os.path.abspath(directory)
+    with _lock:
+        if directory in _watched:
+            return _watched[directory]
+        if not os.path.isdir(directory):
+            logging.error(f"Not watching {directory}, it does not exist")
+            return None
+        handler = DebouncedHandler(directory, on_changes, WATCHER_DEBOUNCE if debounce is None else debounce)
+        observer = _start_observer()
+        try:
+            observer.schedule(handler, directory, recursive=True)
+        except OSError as e:
+            # Usually the inotify watch limit, fall back to polling for this directory
+            logging.error(f"Native watching of {directory} failed, polling it instead: {e}")
+            polling = PollingObserver(timeout=WATCHER_POLL_INTERVAL)
+            polling.schedule(handler, directory, recursive=True)
+            polling.start()
+        _watched[directory] = handler
+
+    def scan():
+        try:
+            if initial_scan:
+                initial_scan()
+        except Exception as e:
+            logging.error(f"Initial scan of {directory} failed: {e}")
+        handler.ready.set()
+
+    threading.Thread(target=scan, name=f"scan:{directory}", daemon=True).start()
+    return handler
+
+def is_watched(directory):
+    """True once directory is watched and its initial scan has finished, queries can then skip their own walk."""
+    handler = _watched.get(os.path.abspath(directory))
+    return handler is not None and handler.ready.is_set()
+
+def _claim_watching():
+    """True in the one process that gets to watch, the indexes are shared between all processes."""
+    global _process_lock
+    if _process_lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:  # no flock, e.g. Windows
+        return True
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        lock_file = open(os.path.join(CACHE_DIR, "watcher.lock"), "w")
+    except OSError as e:
+        # The indexes fall back to memory in this case too, so none are shared to guard
+        logging.error(f"Watcher lock could not be created in {CACHE_DIR}, watching in this process: {e}")
+        return True
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _process_lock = lock_file
+    return True
+
+def start_watchers():
+    """Keep the document index and the photo index current in the background, once across all processes."""
+    from services.search import documents, photos
+
+    if not _claim_watching():
+        logging.info("Another process is already watching the documents and photos")
+        return
+
+    def document_changes(changed, deleted):
+        for path in deleted:
+            documents.document_index.remove(path)
+        for path in changed:
+            if os.path.isdir(path):
+                # A directory moved in, index everything below it
+                documents.document_index.refresh(path, documents.extract_text, documents.DOCUMENT_EXTENSIONS)
+            elif path.endswith(documents.DOCUMENT_EXTENSIONS):
+                documents.document_index.update(path, documents.extract_text)
+
+    watch(
+        documents.DOCUMENTS_DIR,
+        document_changes,
+        lambda: documents.document_index.refresh(documents.DOCUMENTS_DIR, documents.extract_text, documents.DOCUMENT_EXTENSIONS),
+    )
+
+    def photo_changes(changed, deleted):
+        for path in deleted:
+            photos.photo_index.remove(path)
+        for path in changed:
+            photos.photo_index.update(path, photos.get_date_taken)
+
+    watch(photos.photo_dir, photo_changes, lambda: photos.photo_index.refresh(photos.photo_dir, photos.get_date_taken))
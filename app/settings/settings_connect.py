@@ -6,4 +6,29 @@ settings_connect = {
         "value": '',
         "description": 'Required for public transportation queries. Create a ReseRobot project and generate your FREE token at https://www.trafiklab.se/docs/using-trafiklab/getting-started/'
     },
+    "HTTP_POOL_CONNECTIONS": {
+        "title": 'HTTP Connection Pools',
+        "value": 20,
+        "description": 'Number of hosts that keep a pool of open keep-alive connections.'
+    },
+    "HTTP_POOL_MAXSIZE": {
+        "title": 'HTTP Pool Size',
+        "value": 10,
+        "description": 'Maximum number of open connections per host.'
+    },
+    "HTTP_HOST_POOL_SIZES": {
+        "title": 'HTTP Pool Size Per Host',
+        "value": "{'api.resrobot.se': 4}",
+        "description": 'Overrides the pool size for specific hosts.'
+    },
+    "HTTP_CONNECT_TIMEOUT": {
+        "title": 'HTTP Connect Timeout',
+        "value": 5,
+        "description": 'Seconds to wait for a connection to be established.'
+    },
+    "HTTP_READ_TIMEOUT": {
+        "title": 'HTTP Read Timeout',
+        "value": 10,
+        "description": 'Seconds to wait for the server to send data.'
+    },
 }
@@ -6,6 +6,36 @@ settings_general = {
         "value": 'english',
         "description": 'The default language to use when language detection fails.'
     },
+    "CACHE_DIR": {
+        "title": 'Cache Directory',
+        "value": '/app/app/Cache',
+        "description": 'Directory where search results and other caches are stored between restarts.'
+    },
+    "ENABLE_WATCHER": {
+        "title": 'Enable File Watcher',
+        "value": True,
+        "description": 'Watches your documents and photos in the background and keeps their indexes up to date, so searches never walk the folders and new files are searchable within seconds.'
+    },
+    "WATCHER_DEBOUNCE": {
+        "title": 'File Watcher Delay',
+        "value": 2,
+        "description": 'Seconds without further changes before changed files are indexed, so a file being copied is only indexed once.'
+    },
+    "WATCHER_POLL_INTERVAL": {
+        "title": 'File Watcher Poll Interval',
+        "value": 10,
+        "description": 'Seconds between folder scans when native file change notifications are unavailable.'
+    },
+    "BATCH_CONCURRENCY": {
+        "title": 'Batch Concurrency',
+        "value": 4,
+        "description": 'Number of queries from one /batch request that are answered at the same time.'
+    },
+    "BATCH_MAX_QUERIES": {
+        "title": 'Batch Size Limit',
+        "value": 20,
+        "description": 'Maximum number of queries accepted in one /batch request.'
+    },
     "ENABLE_TRANSPORT": {
         "title": 'Enable Transport',
         "value": False,
@@ -6,9 +6,24 @@ settings_score = {
         "value": 6,
         "description": 'Minimum score threshold for search results to be considered relevant.'
     },
+    "PASSAGE_MIN_SCORE": {
+        "title": 'Minimum Passage Score',
+        "value": 2,
+        "description": 'Minimum score a passage of a scraped page needs before the page is used as an answer.'
+    },
+    "BM25_TOP_K": {
+        "title": 'Passages Per Page',
+        "value": 3,
+        "description": 'Number of best ranked passages of a page that are handed to the AI chat.'
+    },
+    "PASSAGE_WORDS": {
+        "title": 'Passage Length',
+        "value": 60,
+        "description": 'Maximum number of words in a passage when ranking scraped pages.'
+    },
     "important_phrases": {
         "title": 'Important Phrases',
         "value": "['stänger', 'öppnar', 'öppettider', 'umeå', 'när', 'tid', 'datum', 'match', 'klockan', 'pris', 'väder', 'regn', 'idag', 'imorgon', 'björklöven', 'björklövens']",
-        "description": 'A list of words giving double score (+2).'
+        "description": 'A list of words or phrases giving double score (+2).'
     },
 }
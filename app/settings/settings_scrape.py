@@ -5,4 +5,24 @@ settings_scrape = {
         "value": False,
         "description": 'Enables you to create your own customized EPG (Electronic Program Guide), by specifying a URL to scrape for data, for each of your channels. After scraping, the data is analyzed, processed and extracted into JSON, after which all your channel data is combined into a proper xmltv format to be used as a EPG. This service also comes with a built in web application at http://localhost:5556/epg'
     },
+    "HTML_PARSER": {
+        "title": 'HTML Parser',
+        "value": 'lxml',
+        "description": "Engine used to extract text from scraped pages. 'lxml' streams the page and stops at the first match, 'html.parser' builds a full BeautifulSoup tree."
+    },
+    "MAX_PAGE_BYTES": {
+        "title": 'Max Page Size',
+        "value": 2000000,
+        "description": 'Maximum number of bytes downloaded from a single page.'
+    },
+    "PAGE_CACHE_MAX_BYTES": {
+        "title": 'Page Cache Size',
+        "value": 100000000,
+        "description": 'Maximum size in bytes of scraped pages kept on disk for conditional requests. Set to 0 to disable.'
+    },
+    "PAGE_CACHE_MAX_AGE": {
+        "title": 'Page Cache Max Age',
+        "value": 604800,
+        "description": 'Seconds a scraped page is kept before it is downloaded again in full.'
+    },
 }
@@ -6,16 +6,86 @@ settings_search = {
         "value": 60,
         "description": 'Determines how many websites will be searched.'
     },
+    "MAX_PARALLEL_FETCHES": {
+        "title": 'Max Parallel Fetches',
+        "value": 8,
+        "description": 'Maximum number of websites inspected at the same time.'
+    },
+    "MAX_FETCHES_PER_HOST": {
+        "title": 'Max Fetches Per Host',
+        "value": 2,
+        "description": 'Maximum number of simultaneous requests to the same website.'
+    },
+    "DOMAIN_REORDER": {
+        "title": 'Reorder Websites By History',
+        "value": True,
+        "description": 'If enabled, websites that have answered quickly before are inspected first and slow or unhelpful ones later.'
+    },
+    "DOMAIN_FAILURE_THRESHOLD": {
+        "title": 'Website Failure Limit',
+        "value": 3,
+        "description": 'Failed fetches in a row after which a website is skipped for the cooldown. Set to 0 to never skip.'
+    },
+    "DOMAIN_COOLDOWN": {
+        "title": 'Website Cooldown',
+        "value": 1800,
+        "description": 'Seconds a failing website is skipped before it is tried again.'
+    },
     "FALLBACK_TO_AI_CHAT": {
         "title": 'Fallback to AI Chat',
         "value": True,
         "description": 'If enabled, the system will fallback to an AI chat mode if the search fails.'
     },
+    "SPECULATIVE_AI_CHAT": {
+        "title": 'Speculative AI Chat',
+        "value": False,
+        "description": 'If enabled, the AI chat is asked at the same time as the websites are scanned and whichever confident answer arrives first is used. Requires Fallback to AI Chat.'
+    },
+    "SPECULATIVE_AI_DELAY": {
+        "title": 'Speculative AI Chat Delay',
+        "value": 2,
+        "description": 'Seconds the website scan gets before the speculative AI chat starts, limits AI traffic when the websites answer quickly.'
+    },
+    "REQUEST_DEADLINE": {
+        "title": 'Request Deadline',
+        "value": 20,
+        "description": 'Seconds a question may take from search to answer. Search, page fetches and the AI chat share this budget and the best answer so far is returned when it runs out. A request can set its own with a "deadline" field. Set to 0 for no limit.'
+    },
+    "AI_CACHE_TTL": {
+        "title": 'AI Answer Cache TTL',
+        "value": 1800,
+        "description": 'Seconds an AI chat answer is reused when the same question arrives with the same scraped data. Set to 0 to disable the cache.'
+    },
+    "AI_CACHE_MAX_ENTRIES": {
+        "title": 'AI Answer Cache Memory Entries',
+        "value": 256,
+        "description": 'Number of AI chat answers kept in memory.'
+    },
+    "AI_CACHE_MAX_BYTES": {
+        "title": 'AI Answer Cache Disk Size',
+        "value": 10000000,
+        "description": 'Maximum size in bytes of the AI chat answers stored on disk.'
+    },
     "LOOP_UNTIL_SUCCESS": {
         "title": 'Loop Until Success',
         "value": False,
         "description": 'If true, the system will continue to attempt the search until it succeeds.'
     },
+    "SEARCH_CACHE_TTL": {
+        "title": 'Search Cache TTL',
+        "value": 3600,
+        "description": 'Seconds a web search result is reused for the same question. Set to 0 to disable the cache.'
+    },
+    "SEARCH_CACHE_MAX_ENTRIES": {
+        "title": 'Search Cache Memory Entries',
+        "value": 256,
+        "description": 'Number of search results kept in memory.'
+    },
+    "SEARCH_CACHE_MAX_BYTES": {
+        "title": 'Search Cache Disk Size',
+        "value": 20000000,
+        "description": 'Maximum size in bytes of the search results stored on disk.'
+    },
     "REGION": {
         "title": 'Region',
         "value": 'se-sv',
@@ -26,4 +96,64 @@ settings_search = {
         "value": 4,
         "description": 'The number of lines before and after the matched line when searching your local documents.'
     },
+    "DOCS_STREAM_MIN_BYTES": {
+        "title": 'Docs Streaming Size',
+        "value": 20000000,
+        "description": 'Text and CSV files of at least this many bytes are not indexed but scanned directly on disk when searching, keeping memory use flat for very large logs and exports. Set to 0 to index every file.'
+    },
+    "DOCS_RESULT_LIMIT": {
+        "title": 'Docs Result Limit',
+        "value": 5,
+        "description": 'The number of best ranked matches returned by a document search, further pages can be requested with an offset.'
+    },
+    "DOCS_MAX_HITS": {
+        "title": 'Docs Max Scored Matches',
+        "value": 1000,
+        "description": 'A document search stops scanning large files once this many matches were scored, the results are ranked among those.'
+    },
+    "DOCS_RECENCY_HALF_LIFE": {
+        "title": 'Docs Recency Half-Life',
+        "value": 365,
+        "description": 'Days after which the recency bonus of a document in search ranking has halved.'
+    },
+    "DOCS_FUZZY_SEARCH": {
+        "title": 'Docs Fuzzy Search',
+        "value": 'fallback',
+        "description": "Typo tolerant document search. 'fallback' uses it when nothing matches exactly, 'always' adds fuzzy matches after the exact ones, 'off' disables it."
+    },
+    "DOCS_FUZZY_MIN_SCORE": {
+        "title": 'Docs Fuzzy Min Score',
+        "value": 80,
+        "description": 'Minimum similarity (0-100) between the query and part of a line for a fuzzy match.'
+    },
+    "DOCS_FUZZY_TOP_K": {
+        "title": 'Docs Fuzzy Results',
+        "value": 10,
+        "description": 'Maximum number of fuzzy matches returned.'
+    },
+    "DOCS_FUZZY_WORKERS": {
+        "title": 'Docs Fuzzy Workers',
+        "value": 0,
+        "description": 'Threads used to score lines in a fuzzy search. Set to 0 to use every CPU core.'
+    },
+    "TEXT_CACHE_MAX_BYTES": {
+        "title": 'Document Text Cache Size',
+        "value": 200000000,
+        "description": 'Maximum size in bytes of compressed text extracted from your documents, kept so unchanged PDFs, CSVs and Markdown files are not converted again. Set to 0 to disable.'
+    },
+    "INGEST_WORKERS": {
+        "title": 'Document Ingestion Workers',
+        "value": 0,
+        "description": 'Number of processes extracting documents when they are ingested. Set to 0 to use one per CPU core.'
+    },
+    "INGEST_FILE_TIMEOUT": {
+        "title": 'Document Ingestion Timeout',
+        "value": 60,
+        "description": 'Seconds a single document may take to extract before it is skipped, so one corrupt PDF cannot stall the ingestion.'
+    },
+    "PHOTO_EXIF_WORKERS": {
+        "title": 'Photo Date Reader Threads',
+        "value": 0,
+        "description": 'Threads reading the date taken of new and changed photos. Set to 0 for four per CPU core, up to 32.'
+    },
 }
@@ -10,6 +10,7 @@ from langdetect import detect, LangDetectException
 from langcodes import Language
 import argparse
 import os
+from requests.adapters import HTTPAdapter
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
 ### --> GLOBAL SETTINGS <-- ###
 
@@ -101,6 +102,14 @@ language_to_output_format = {
 
 logging.basicConfig(level=logging.INFO)
 
+# One keep-alive session for all page fetches, the CLI doesn't load the app's settings
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+def http_get(url, timeout=(5, 10), **kwargs):
+    return session.get(url, timeout=timeout, **kwargs)
+
 docs_logger = logging.getLogger('docs_logs')
 docs_logger.setLevel(logging.INFO)
 docs_log_handler = logging.StreamHandler()
@@ -167,7 +176,7 @@ def inspect_page_source(url, user_input):
         
         for attempt in range(3):  # Try up to 3 times with different headers
             try:
-                page = requests.get(url, headers=headers, timeout=10)
+                page = http_get(url, headers=headers)
                 page.raise_for_status()
                 soup = BeautifulSoup(page.content, 'html.parser')
                 